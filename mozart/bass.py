@@ -4,6 +4,7 @@ import random
 
 from mozart.player import Clip, PlayedNote
 from mozart.primitives import Chord, MidiNote, TimeSignature
+from mozart.profiling import profiled
 
 
 class BassArticulator:
@@ -30,12 +31,11 @@ class BassArticulator:
         max_velocity = self.intensity * 25
 
         for note in notes:
-            _n = note.copy()
-            _n.velocity = random.randint(max_velocity - 20, max_velocity)
-            _notes.append(_n)
+            _notes.append(note.with_velocity(random.randint(max_velocity - 20, max_velocity)))
 
         return _notes
 
+    @profiled()
     def articulate_root(self, chord: Chord) -> Clip:
         """
         Articulates root note of chord
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from typing import Callable
+
+from mozart.midifile import MidiClip, parse_midfile
+from mozart.notebuffer import NoteBuffer
+from mozart.player import Clip
+from mozart.primitives import TimeSignature
+
+MAGIC = b"MZC1"
+
+# magic, bpm, time signature numerator and denominator (0 if there is none), _ends_at of the clip (-1 if None),
+# length of the name, number of notes. Followed by the name and the note columns
+HEADER = struct.Struct("<4sIHHqHQ")
+
+# typecodes of the NoteBuffer columns
+COLUMNS = ("q", "q", "h", "h", "b")
+
+
+def dump_clip(midi_clip: MidiClip) -> bytes:
+    """
+    Packs a MidiClip into bytes, columns are stored little endian
+    """
+    clip = midi_clip.clip
+    notes = clip.notes
+    time_signature = midi_clip.time_signature
+    name = midi_clip.name.encode()
+
+    data = bytearray(
+        HEADER.pack(
+            MAGIC,
+            midi_clip.bpm,
+            time_signature.numerator if time_signature else 0,
+            time_signature.denominator if time_signature else 0,
+            clip._ends_at if clip._ends_at is not None else -1,
+            len(name),
+            len(notes),
+        )
+    )
+    data += name
+
+    for column in (notes.start, notes.end, notes.pitch, notes.velocity, notes.channel):
+        if sys.byteorder == "big":
+            column = array(column.typecode, column)
+            column.byteswap()
+
+        data += column.tobytes()
+
+    return bytes(data)
+
+
+def load_clip(data: bytes) -> MidiClip:
+    """
+    Unpacks a MidiClip packed with dump_clip. Raises ValueError if `data` is not one
+    """
+    if len(data) < HEADER.size or data[:4] != MAGIC:
+        raise ValueError("Not a packed clip")
+
+    _, bpm, numerator, denominator, ends_at, name_length, count = HEADER.unpack_from(data)
+    position = HEADER.size
+
+    name = data[position : position + name_length].decode()
+    position += name_length
+
+    columns = []
+    for typecode in COLUMNS:
+        column = array(typecode)
+        size = column.itemsize * count
+        column.frombytes(data[position : position + size])
+        if len(column) != count:
+            raise ValueError("Truncated packed clip")
+
+        if sys.byteorder == "big":
+            column.byteswap()
+
+        columns.append(column)
+        position += size
+
+    return MidiClip(
+        clip=Clip(_ends_at=ends_at if ends_at >= 0 else None, notes=NoteBuffer.from_columns(*columns)),
+        bpm=bpm,
+        time_signature=TimeSignature(numerator, denominator) if denominator else None,
+        name=name,
+    )
+
+
+class ClipCache:
+    """
+    Parsed midi files, packed on disk in `directory` so they are parsed only once across runs.
+
+    Entries are keyed by the path, size and modification time of the file, or by a hash of its content if
+    `hash_content`. Once the cache grows over `max_bytes`, least recently used entries are removed till it is down to
+    3/4 of it, so the directory is listed once in a while rather than on every store
+    """
+
+    directory: str
+    max_bytes: int
+    hash_content: bool
+    parser: Callable[[str], MidiClip]
+
+    # bytes taken by the entries, kept up to date as entries are stored and removed
+    size: int
+
+    hits: int
+    misses: int
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 64 << 20,
+        hash_content: bool = False,
+        parser: Callable[[str], MidiClip] = parse_midfile,
+    ) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hash_content = hash_content
+        self.parser = parser
+
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self.size = sum(size for _, size, _ in self._entries())
+
+    def key(self, filepath: str) -> str:
+        if self.hash_content:
+            with open(filepath, "rb") as file:
+                return hashlib.blake2b(file.read(), digest_size=16).hexdigest()
+
+        stat = os.stat(filepath)
+        key = f"{os.path.abspath(filepath)}\0{stat.st_size}\0{stat.st_mtime_ns}"
+        return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+    def load(self, filepath: str) -> MidiClip:
+        """
+        Returns the parsed clip of `filepath`, from the cache if it is there
+        """
+        entry = os.path.join(self.directory, self.key(filepath) + ".clip")
+
+        try:
+            with open(entry, "rb") as file:
+                midi_clip = load_clip(file.read())
+
+            # the modification time of entries orders them for eviction
+            os.utime(entry)
+            self.hits += 1
+            return midi_clip
+        except (OSError, ValueError):
+            pass
+
+        self.misses += 1
+        midi_clip = self.parser(filepath)
+        self._store(entry, dump_clip(midi_clip))
+        return midi_clip
+
+    def clear(self):
+        for entry, _, _ in self._entries():
+            os.remove(entry)
+
+        self.size = 0
+
+    def _store(self, entry: str, data: bytes):
+        # written to a temporary file first, so other processes never read a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+
+        # replaces an entry that could not be read
+        try:
+            self.size -= os.stat(entry).st_size
+        except FileNotFoundError:
+            pass
+
+        os.replace(tmp_path, entry)
+        self.size += len(data)
+
+        if self.size > self.max_bytes:
+            self._evict()
+
+    def _entries(self) -> list[tuple[str, int, int]]:
+        """
+        Returns (path, size, mtime) of the entries, least recently used first
+        """
+        entries = []
+        with os.scandir(self.directory) as it:
+            for item in it:
+                if item.name.endswith(".clip"):
+                    stat = item.stat()
+                    entries.append((item.path, stat.st_size, stat.st_mtime_ns))
+
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def _evict(self):
+        # listed again, as other processes may share the directory
+        entries = self._entries()
+        self.size = sum(size for _, size, _ in entries)
+
+        for path, size, _ in entries:
+            if self.size <= self.max_bytes * 3 // 4:
+                break
+
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+            self.size -= size
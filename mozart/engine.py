@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+
+import mido
+
+from mozart.scheduler import DEFAULT_SPIN, wait_until
+from mozart.stats import TimingStats
+
+
+class OutputEngine:
+    """
+    Sends messages on a dedicated thread, at their time.
+
+    Producers `schedule` messages in time order, up to `lookahead` seconds ahead of playback. `schedule` blocks when a
+    message is further ahead than that, or when `maxsize` messages are already waiting, so slow producers only delay
+    what is queued next and never the sending itself
+    """
+
+    outport = None
+    lookahead: float
+    spin: float
+    stats: TimingStats | None
+
+    # time.perf_counter() at which time 0 of the scheduled messages is played
+    started_at: float | None = None
+
+    def __init__(
+        self,
+        outport,
+        lookahead: float = 2.0,
+        maxsize: int = 4096,
+        spin: float = DEFAULT_SPIN,
+        stats: TimingStats | None = None,
+    ) -> None:
+        """
+        Sends are recorded in `stats`, if given, and messages dropped by `stop` are counted there
+        """
+        self.outport = outport
+        self.lookahead = lookahead
+        self.spin = spin
+        self.stats = stats
+
+        # (at, message), None to stop the thread
+        self._queue: queue.Queue[tuple[float, mido.Message] | None] = queue.Queue(maxsize)
+        self._thread: threading.Thread | None = None
+        # set by stop(drain=False), wakes up the thread if it is waiting to send
+        self._dropping = threading.Event()
+
+    def start(self, delay: float = 0.0):
+        """
+        Starts sending, time 0 of the scheduled messages is `delay` seconds from now
+        """
+        if self._thread:
+            raise ValueError("Engine is already started")
+
+        self.started_at = time.perf_counter() + delay
+        self._thread = threading.Thread(target=self._run, name="mozart-output", daemon=True)
+        self._thread.start()
+
+    def schedule(self, at: float, message: mido.Message):
+        """
+        Queues `message` to be sent `at` seconds after the start. Blocks till it is within the lookahead
+        """
+        if self.started_at is None:
+            raise ValueError("Engine is not started")
+
+        wait_until(self.started_at + at - self.lookahead, spin=0)
+        self._queue.put((at, message))
+
+    def stop(self, drain: bool = True):
+        """
+        Stops the engine once the queued messages are sent. If `drain` is False, queued messages are dropped instead
+        and notes that are still sounding are turned off
+        """
+        if not self._thread:
+            return
+
+        if not drain:
+            self._dropping.set()
+
+        self._queue.put(None)
+        self._thread.join()
+
+        self._thread = None
+        self._dropping.clear()
+        self.started_at = None
+
+    def _run(self):
+        # (channel, note) of the notes sent and not yet turned off
+        sounding: set[tuple[int, int]] = set()
+
+        while True:
+            item = self._queue.get()
+            if item is None:
+                # dropped note_offs would leave notes stuck on the port
+                if self._dropping.is_set():
+                    for channel, note in sounding:
+                        self.outport.send(mido.Message("note_off", channel=channel, note=note))
+
+                return
+
+            at, message = item
+            deadline = self.started_at + at
+
+            # sleeps on the event, so stop(drain=False) does not wait for the message to be due
+            self._dropping.wait(max(deadline - time.perf_counter() - self.spin, 0))
+            if self._dropping.is_set():
+                if self.stats:
+                    self.stats.drop()
+                continue
+
+            wait_until(deadline, self.spin)
+
+            sent_at = time.perf_counter()
+            self.outport.send(message)
+            if self.stats:
+                self.stats.record(deadline, sent_at, time.perf_counter() - sent_at)
+
+            # a note_on with velocity 0 is a note_off
+            if message.type == "note_on" and message.velocity:
+                sounding.add((message.channel, message.note))
+            elif message.type in ("note_on", "note_off"):
+                sounding.discard((message.channel, message.note))
@@ -5,6 +5,7 @@ from dataclasses import dataclass
 from enum import Enum
 
 from mozart.primitives import Chord, Mode, Note, Scale
+from mozart.profiling import profiled
 
 
 class ChordCategory(Enum):
@@ -143,6 +144,7 @@ class ChordProgressionGenerator:
 
         return self.scale.get_diatonic_triad(degree)
 
+    @profiled()
     def generate_v2(
         self,
         start_with: ChordCategory = ChordCategory.TONIC,
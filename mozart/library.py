@@ -0,0 +1,338 @@
+from __future__ import annotations
+
+import math
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator
+
+from mozart.midifile import MidiClip, meta_from_smf, read_midfile, track_notes
+from mozart.primitives import TimeSignature
+from mozart.smf import read_smf
+
+DRUM_CHANNEL = 9
+
+EXTENSIONS = (".mid", ".midi")
+
+SCHEMA = """
+create table if not exists clips (
+    path text primary key,
+    size integer not null,
+    mtime_ns integer not null,
+    bpm integer not null,
+    numerator integer,
+    denominator integer,
+    beats real not null,
+    bars integer not null,
+    notes integer not null,
+    density real not null,
+    pitch_min integer,
+    pitch_max integer,
+    channels integer not null
+);
+create index if not exists clips_by_meter on clips (numerator, denominator, bpm);
+create index if not exists clips_by_bars on clips (bars);
+
+create table if not exists drum_notes (
+    path text not null references clips (path) on delete cascade,
+    note integer not null,
+    primary key (path, note)
+);
+create index if not exists drum_notes_by_note on drum_notes (note);
+"""
+
+
+@dataclass
+class ClipInfo:
+    path: str
+    size: int
+    mtime_ns: int
+    bpm: int
+    time_signature: TimeSignature | None
+    # length of the clip, to the end of its last note
+    beats: float
+    bars: int
+    notes: int
+    # notes per bar
+    density: float
+    pitch_min: int | None
+    pitch_max: int | None
+    # bit i is set if midi channel i is used
+    channels: int
+    drum_notes: frozenset[int] = field(default_factory=frozenset)
+
+    @property
+    def has_drums(self) -> bool:
+        return bool(self.channels & (1 << DRUM_CHANNEL))
+
+
+@dataclass
+class ScanResult:
+    indexed: int = 0
+    unchanged: int = 0
+    removed: int = 0
+    # path : error
+    failed: dict[str, str] = field(default_factory=dict)
+
+
+def describe(filepath: str) -> ClipInfo:
+    """
+    Reads a midi file with the fast path and summarises it. Notes are paired per track by channel and pitch, as in
+    import_tracks. Bars are counted in beats of the time signature numerator, 4 if the file has no time signature
+    """
+    stat = os.stat(filepath)
+    smf = read_smf(filepath)
+    meta = meta_from_smf(smf)
+
+    count = 0
+    max_end = 0
+    pitch_min = pitch_max = None
+    channels = 0
+    drum_notes = set()
+
+    for track in smf.tracks:
+        for _, end, pitch, _, channel in track_notes(track):
+            count += 1
+            max_end = max(max_end, end)
+            pitch_min = pitch if pitch_min is None else min(pitch_min, pitch)
+            pitch_max = pitch if pitch_max is None else max(pitch_max, pitch)
+
+            channels |= 1 << channel
+            if channel == DRUM_CHANNEL:
+                drum_notes.add(pitch)
+
+    beats = max_end / smf.ticks_per_beat
+    beats_per_bar = meta.time_signature.numerator if meta.time_signature else 4
+    bars = math.ceil(beats / beats_per_bar)
+
+    return ClipInfo(
+        path=os.path.abspath(filepath),
+        size=stat.st_size,
+        mtime_ns=stat.st_mtime_ns,
+        bpm=meta.bpm,
+        time_signature=meta.time_signature,
+        beats=beats,
+        bars=bars,
+        notes=count,
+        density=count / bars if bars else 0.0,
+        pitch_min=pitch_min,
+        pitch_max=pitch_max,
+        channels=channels,
+        drum_notes=frozenset(drum_notes),
+    )
+
+
+def _describe(filepath: str) -> tuple[str, ClipInfo | None, str | None]:
+    """
+    describe for the process pool, errors are returned so one broken file does not stop the scan
+    """
+    try:
+        return filepath, describe(filepath), None
+    except Exception as e:
+        return filepath, None, f"{e.__class__.__name__}: {e}"
+
+
+def find_midi_files(directory: str) -> Iterator[str]:
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.lower().endswith(EXTENSIONS):
+                yield os.path.abspath(os.path.join(root, name))
+
+
+class ClipLibrary:
+    """
+    Index of the midi files under a directory, stored in sqlite at `index_path`, to pick clips without parsing them.
+
+    `scan` parses new and changed files in a process pool, `query` filters the index
+    """
+
+    index_path: str
+    connection: sqlite3.Connection
+
+    def __init__(self, index_path: str) -> None:
+        self.index_path = index_path
+        self.connection = sqlite3.connect(index_path)
+        self.connection.execute("pragma foreign_keys = on")
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self) -> ClipLibrary:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.connection.execute("select count(*) from clips").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+    def scan(self, directory: str, processes: int | None = None, chunksize: int = 16) -> ScanResult:
+        """
+        Indexes new and changed midi files under `directory` and drops the ones that are gone. Files are parsed in
+        `processes` worker processes, as many as there are cpus by default, or in this process if it is 1
+        """
+        result = ScanResult()
+        directory = os.path.abspath(directory)
+
+        known = {
+            path: (size, mtime_ns)
+            for path, size, mtime_ns in self.connection.execute("select path, size, mtime_ns from clips")
+            if os.path.commonpath([path, directory]) == directory
+        }
+
+        pending = []
+        for path in find_midi_files(directory):
+            stat = os.stat(path)
+            if known.pop(path, None) == (stat.st_size, stat.st_mtime_ns):
+                result.unchanged += 1
+            else:
+                pending.append(path)
+
+        with self.connection:
+            self.connection.executemany("delete from clips where path = ?", [(path,) for path in known])
+            result.removed = len(known)
+
+            for path, info, error in self._describe_all(pending, processes, chunksize):
+                if info is None:
+                    result.failed[path] = error
+                    continue
+
+                self._put(info)
+                result.indexed += 1
+
+        return result
+
+    def _describe_all(
+        self, paths: list[str], processes: int | None, chunksize: int
+    ) -> Iterable[tuple[str, ClipInfo | None, str | None]]:
+        if processes == 1 or len(paths) <= 1:
+            return map(_describe, paths)
+
+        with ProcessPoolExecutor(processes) as executor:
+            return list(executor.map(_describe, paths, chunksize=chunksize))
+
+    def _put(self, info: ClipInfo):
+        time_signature = info.time_signature
+
+        self.connection.execute("delete from clips where path = ?", (info.path,))
+        self.connection.execute(
+            "insert into clips values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                info.path,
+                info.size,
+                info.mtime_ns,
+                info.bpm,
+                time_signature.numerator if time_signature else None,
+                time_signature.denominator if time_signature else None,
+                info.beats,
+                info.bars,
+                info.notes,
+                info.density,
+                info.pitch_min,
+                info.pitch_max,
+                info.channels,
+            ),
+        )
+        self.connection.executemany(
+            "insert into drum_notes values (?, ?)", [(info.path, note) for note in sorted(info.drum_notes)]
+        )
+
+    def query(
+        self,
+        time_signature: TimeSignature | None = None,
+        min_bpm: int | None = None,
+        max_bpm: int | None = None,
+        bars: int | None = None,
+        min_bars: int | None = None,
+        max_bars: int | None = None,
+        channel: int | None = None,
+        drums: bool | None = None,
+        drum_notes: Iterable[int] = (),
+        min_pitch: int | None = None,
+        max_pitch: int | None = None,
+    ) -> list[ClipInfo]:
+        """
+        Returns the indexed clips matching all of the given filters, ordered by path. `drum_notes` matches clips using
+        all of the given notes on the drum channel, `min_pitch` and `max_pitch` the ones whose notes are all in range
+        """
+        where = []
+        params: list = []
+
+        def add(condition: str, *values):
+            where.append(condition)
+            params.extend(values)
+
+        if time_signature is not None:
+            add("numerator = ? and denominator = ?", time_signature.numerator, time_signature.denominator)
+        if min_bpm is not None:
+            add("bpm >= ?", min_bpm)
+        if max_bpm is not None:
+            add("bpm <= ?", max_bpm)
+        if bars is not None:
+            add("bars = ?", bars)
+        if min_bars is not None:
+            add("bars >= ?", min_bars)
+        if max_bars is not None:
+            add("bars <= ?", max_bars)
+        if channel is not None:
+            add("channels & ? != 0", 1 << channel)
+        if drums is not None:
+            add(f"channels & ? {'!=' if drums else '='} 0", 1 << DRUM_CHANNEL)
+        if min_pitch is not None:
+            add("pitch_min >= ?", min_pitch)
+        if max_pitch is not None:
+            add("pitch_max <= ?", max_pitch)
+
+        for note in set(drum_notes):
+            add("exists (select 1 from drum_notes d where d.path = clips.path and d.note = ?)", note)
+
+        # drum notes come along in one query, comma separated
+        sql = "select clips.*, group_concat(d.note) from clips left join drum_notes d on d.path = clips.path"
+        if where:
+            sql += " where " + " and ".join(where)
+
+        rows = self.connection.execute(sql + " group by clips.path order by clips.path", params).fetchall()
+        return [self._info(row) for row in rows]
+
+    @staticmethod
+    def _info(row: tuple) -> ClipInfo:
+        (
+            path,
+            size,
+            mtime_ns,
+            bpm,
+            numerator,
+            denominator,
+            beats,
+            bars,
+            notes,
+            density,
+            pitch_min,
+            pitch_max,
+            channels,
+            drum_notes,
+        ) = row
+
+        return ClipInfo(
+            path=path,
+            size=size,
+            mtime_ns=mtime_ns,
+            bpm=bpm,
+            time_signature=TimeSignature(numerator, denominator) if numerator else None,
+            beats=beats,
+            bars=bars,
+            notes=notes,
+            density=density,
+            pitch_min=pitch_min,
+            pitch_max=pitch_max,
+            channels=channels,
+            drum_notes=frozenset(int(note) for note in drum_notes.split(",")) if drum_notes else frozenset(),
+        )
+
+    def load(self, info: ClipInfo) -> MidiClip:
+        """
+        Reads the clip of `info`. Notes are paired by channel and pitch, as describe does, and keep their channel
+        """
+        return read_midfile(info.path, by_channel=True)
@@ -1,12 +1,21 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from typing import Iterable, Iterator
 
-from mido import Message, MetaMessage, MidiFile, merge_tracks, tempo2bpm
+from mido import MetaMessage, MidiFile, MidiTrack, bpm2tempo, merge_tracks, tempo2bpm
 
 import math
-from mozart.player import Clip, PlayedNote
-from mozart.primitives import Note, TimeSignature
+from mozart.notebuffer import convert_ticks
+from mozart.player import Clip, PlayedNote, Player, Track, make_message
+from mozart.primitives import TimeSignature
+from mozart.profiling import profiled
+from mozart.smf import META_TEMPO, META_TIME_SIGNATURE, SmfFile, SmfTrack, read_smf
+from mozart.timeline import NOTE_ON
+
+
+# parse_midfile gives every note this velocity, rather than the one in the file
+PARSED_VELOCITY = 100
 
 
 @dataclass
@@ -46,62 +55,283 @@ def parse_meta(mid: MidiFile) -> tuple[int, int, TimeSignature]:
     return bpm, clocks_per_click, time_sig
 
 
-def make_played_note(note_value: int, velocity: int, starts_at: int, lenght: int, ticks_per_beat: int) -> PlayedNote:
-    note = Note(note_value % 12).get_midi(note_value // 12)
+@dataclass
+class MidiMeta:
+    """
+    Meta messages of a midi file, the last one wins if there are several
+    """
+
+    bpm: int = 0
+    clocks_per_click: int = 0
+    time_signature: TimeSignature | None = None
 
-    end_tick = starts_at + lenght
 
-    start_beat = starts_at // ticks_per_beat
-    start_offset = (starts_at % ticks_per_beat) / ticks_per_beat * 100
+def iter_notes(mid: MidiFile, meta: MidiMeta | None = None) -> Iterator[tuple[int, int, int, int]]:
+    """
+    Yields (start, end, pitch, velocity) of the notes of `mid` as they end, in ticks of the file. Tempo and time
+    signature are collected into `meta` on the way, so they are complete once the generator is exhausted.
 
-    end_beat = end_tick // ticks_per_beat
-    end_offset = (end_tick % ticks_per_beat) / ticks_per_beat * 100
+    A note_on with velocity 0 ends a note, as a note_off does
+    """
+    meta = meta if meta is not None else MidiMeta()
 
-    return PlayedNote(
-        note=note, starts_at=start_beat, starts_at_offset=start_offset, ends_at=end_beat, ends_at_offset=end_offset
-    )
+    # note : (velocity, start_at)
+    note_stack: dict[int, tuple[int, int]] = {}
 
+    total_time_passed = 0
 
+    for msg in merge_tracks(mid.tracks):
+        total_time_passed += msg.time
+
+        if msg.type == "set_tempo":
+            meta.bpm = math.ceil(tempo2bpm(msg.tempo))
+            continue
+
+        if msg.type == "time_signature":
+            meta.time_signature = TimeSignature(msg.numerator, msg.denominator)
+            meta.clocks_per_click = msg.clocks_per_click
+            continue
+
+        if msg.type not in ("note_on", "note_off"):
+            continue
+
+        if msg.note not in note_stack:
+            note_stack[msg.note] = (msg.velocity, total_time_passed)
+            continue
+
+        # encountered two note_on for the same midi value, while expecting a note_off
+        if msg.type == "note_on" and msg.velocity:
+            raise ValueError("Encountered two note_on for the same midi value, while expecting a note_off")
+
+        velocity, start_at = note_stack.pop(msg.note)
+        yield start_at, total_time_passed, msg.note, velocity
+
+
+@profiled()
 def parse_midfile(filepath: str) -> MidiClip:
     """
+    Reads the notes of a midi file into a clip, at the resolution given in the header of the file
 
     Note: If the last note of the track ends at the middle of the bar, the _ends_at won't be set to round off the bar
     """
 
     mid = MidiFile(filepath)
-    bpm, clocks_per_click, time_sig = parse_meta(mid)
+    meta = MidiMeta()
 
-    played_notes = []
+    clip = Clip()
+    notes = clip.notes
 
-    # note : (msg,start_at)
-    note_stack: dict[int, tuple[Message, int]] = {}
+    for start, end, pitch, _ in iter_notes(mid, meta):
+        notes.append(
+            convert_ticks(start, mid.ticks_per_beat),
+            convert_ticks(end, mid.ticks_per_beat),
+            pitch,
+            PARSED_VELOCITY,
+            PlayedNote.midi_channel,
+        )
 
-    total_time_passed = 0
+    return MidiClip(clip=clip, bpm=meta.bpm, time_signature=meta.time_signature)
 
-    for msg in merge_tracks(mid.tracks):
 
-        if isinstance(msg, MetaMessage) or msg.type not in ("note_on", "note_off"):
-            continue
+@profiled()
+def read_midfile(filepath: str, by_channel: bool = False) -> MidiClip:
+    """
+    Fast path of parse_midfile, for bulk ingest. Decodes the file with read_smf instead of going through mido messages
+    and returns the same MidiClip, or the one of clip_from_smf with `by_channel`
+    """
 
-        total_time_passed += msg.time
+    return clip_from_smf(read_smf(filepath), by_channel=by_channel)
 
-        if msg.note not in note_stack:
-            note_stack[msg.note] = (msg, total_time_passed)
+
+def meta_from_smf(smf: SmfFile) -> MidiMeta:
+    """
+    Tempo and time signature of a decoded midi file, as iter_notes collects them
+    """
+    meta = MidiMeta()
+
+    tempo = smf.last_meta(META_TEMPO)
+    if tempo:
+        meta.bpm = math.ceil(tempo2bpm(int.from_bytes(tempo[:3], "big")))
+
+    time_signature = smf.last_meta(META_TIME_SIGNATURE)
+    if time_signature:
+        meta.time_signature = TimeSignature(time_signature[0], 2 ** time_signature[1])
+        meta.clocks_per_click = time_signature[2] if len(time_signature) > 2 else 0
+
+    return meta
+
+
+def clip_from_smf(smf: SmfFile, by_channel: bool = False) -> MidiClip:
+    """
+    Pairs the note events of a decoded midi file into a clip, as parse_midfile does.
+
+    With `by_channel`, notes are paired per track as in track_notes instead, and keep the channel they came from, so
+    files that play the same pitch on several channels can be read
+    """
+    ticks_per_beat = smf.ticks_per_beat
+    meta = meta_from_smf(smf)
+
+    clip = Clip()
+    notes = clip.notes
+
+    if by_channel:
+        for track in smf.tracks:
+            for start, end, pitch, _, channel in track_notes(track):
+                notes.append(
+                    convert_ticks(start, ticks_per_beat),
+                    convert_ticks(end, ticks_per_beat),
+                    pitch,
+                    PARSED_VELOCITY,
+                    channel,
+                )
+
+        return MidiClip(clip=clip, bpm=meta.bpm, time_signature=meta.time_signature)
+
+    # note : (velocity, start_at), notes are paired as in iter_notes
+    note_stack: dict[int, tuple[int, int]] = {}
+
+    for tick, status, note, velocity in smf.events():
+        if note not in note_stack:
+            note_stack[note] = (velocity, tick)
             continue
 
-        # encountered two note_on for the same midi value, while expecting a note_off
-        if msg.type == "note_on":
+        if status & 0xF0 == NOTE_ON and velocity:
             raise ValueError("Encountered two note_on for the same midi value, while expecting a note_off")
 
-        start_msg, start_at = note_stack.pop(msg.note)
-        length = total_time_passed - start_at
+        _, start_at = note_stack.pop(note)
+        notes.append(
+            convert_ticks(start_at, ticks_per_beat),
+            convert_ticks(tick, ticks_per_beat),
+            note,
+            PARSED_VELOCITY,
+            PlayedNote.midi_channel,
+        )
+
+    return MidiClip(clip=clip, bpm=meta.bpm, time_signature=meta.time_signature)
+
+
+def track_notes(track: SmfTrack) -> Iterator[tuple[int, int, int, int, int]]:
+    """
+    Yields (start, end, pitch, velocity, channel) of the notes of a decoded track as they end, in ticks of the file.
+
+    Notes are paired by channel and pitch, so the same pitch can sound on several channels. A note_off without a
+    note_on is dropped
+    """
+    # (channel, note) : (velocity, start_at)
+    note_stack: dict[tuple[int, int], tuple[int, int]] = {}
 
-        # IDK why 4, but seems like it
-        # ticks_per_beat = 4 * clocks_per_click
+    for tick, status, note, velocity in zip(track.tick, track.status, track.note, track.velocity):
+        channel = status & 0x0F
+        key = (channel, note)
+
+        if status & 0xF0 == NOTE_ON and velocity:
+            if key in note_stack:
+                raise ValueError("Encountered two note_on for the same midi value, while expecting a note_off")
+
+            note_stack[key] = (velocity, tick)
+            continue
+
+        if key not in note_stack:
+            continue
+
+        start_velocity, start_at = note_stack.pop(key)
+        yield start_at, tick, note, start_velocity, channel
+
+
+def import_tracks(filepath: str, tracks: Iterable[int] | None = None) -> dict[tuple[int, int], Track]:
+    """
+    Imports each part of a midi file as a Track, keyed by (index of the track in the file, midi channel). Only the
+    tracks in `tracks` are decoded, all of them by default.
+
+    Notes are paired as in track_notes. Each Track holds a single clip at beat 0, with notes on the channel they came
+    from
+    """
+    wanted = set(tracks) if tracks is not None else None
+    smf = read_smf(filepath, tracks=wanted)
+    ticks_per_beat = smf.ticks_per_beat
+
+    imported: dict[tuple[int, int], Track] = {}
+
+    for index, track in enumerate(smf.tracks):
+        if wanted is not None and index not in wanted:
+            continue
 
-        # Skipping the above calculation and hardcoding it to 96
-        ticks_per_beat = 96
+        clips: dict[int, Clip] = {}
 
-        played_notes.append(make_played_note(start_msg.note, start_msg.velocity, start_at, length, ticks_per_beat))
+        for start, end, pitch, velocity, channel in track_notes(track):
+            clip = clips.get(channel)
+            if clip is None:
+                clip = clips[channel] = Clip()
+
+            clip.notes.append(
+                convert_ticks(start, ticks_per_beat),
+                convert_ticks(end, ticks_per_beat),
+                pitch,
+                velocity,
+                channel,
+            )
+
+        for channel in sorted(clips):
+            imported[(index, channel)] = Track(midi_channel=channel, clips={0: clips[channel]})
+
+    return imported
+
+
+def export_midfile(player: Player, filepath: str, time_signature: TimeSignature | None = None) -> MidiFile:
+    """
+    Writes the rendered events of `player` to a type 1 midi file, with one track per midi channel.
+
+    The first track holds the time signature and the tempo map. Nothing is played, so it takes as long as writing the file
+    """
+    time_signature = time_signature or TimeSignature(4, 4)
+
+    mid = MidiFile(type=1, ticks_per_beat=player.ticks_per_beat)
+
+    conductor = MidiTrack(
+        [MetaMessage("time_signature", numerator=time_signature.numerator, denominator=time_signature.denominator)]
+    )
+
+    last_tick = 0
+    for tick, bpm in player.tempo_map.changes():
+        conductor.append(MetaMessage("set_tempo", tempo=bpm2tempo(bpm), time=tick - last_tick))
+        last_tick = tick
+
+    conductor.append(MetaMessage("end_of_track"))
+    mid.tracks.append(conductor)
+
+    # channel : (track, tick of last event)
+    tracks: dict[int, tuple[MidiTrack, int]] = {}
+
+    for tick, status, note, velocity in player.timeline.events():
+        channel = status & 0x0F
+        if channel not in tracks:
+            tracks[channel] = (MidiTrack([MetaMessage("track_name", name=f"Channel {channel + 1}")]), 0)
+
+        track, last_tick = tracks[channel]
+        track.append(make_message(status, note, velocity).copy(time=tick - last_tick))
+        tracks[channel] = (track, tick)
+
+    for channel in sorted(tracks):
+        track, _ = tracks[channel]
+        track.append(MetaMessage("end_of_track"))
+        mid.tracks.append(track)
+
+    mid.save(filepath)
+    return mid
+
+
+def export_tracks(
+    tracks: list[Track],
+    filepath: str,
+    bpm: int = 80,
+    time_signature: TimeSignature | None = None,
+    ticks_per_beat: int = 480,
+) -> MidiFile:
+    """
+    Renders `tracks` and writes them to a midi file, see export_midfile
+    """
+    player = Player(bpm=bpm, backend="null", ticks_per_beat=ticks_per_beat)
+    for track in tracks:
+        player.render_events(track.render_events())
 
-    return MidiClip(clip=Clip(played_notes=played_notes), bpm=bpm, time_signature=time_sig)
+    return export_midfile(player, filepath, time_signature)
@@ -0,0 +1,331 @@
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterator, NamedTuple
+
+# Resolution of note buffers, in ticks per beat.
+# Divisible by 100 so the percentage offsets of PlayedNote map to whole ticks, and by 96, 192, 384, 480 and 960 so
+# notes of the usual midi file resolutions do too
+PPQN = 9600
+
+
+def beats_to_ticks(beats: int, offset: float = 0, ppqn: int = PPQN) -> int:
+    """
+    Converts whole beats and a percentage offset, as in PlayedNote, to ticks
+    """
+    return beats * ppqn + round(offset * ppqn / 100)
+
+
+def ticks_to_beats(ticks: int, ppqn: int = PPQN) -> tuple[int, float]:
+    """
+    Converts ticks to whole beats and a percentage offset, as in PlayedNote. The offset is always positive
+    """
+    beats, rest = divmod(ticks, ppqn)
+    return beats, rest / ppqn * 100
+
+
+def convert_ticks(ticks: int, from_ppqn: int, to_ppqn: int = PPQN) -> int:
+    """
+    Converts ticks from one resolution to another, rounding half up
+    """
+    ticks, rest = divmod(ticks * to_ppqn, from_ppqn)
+    return ticks + (2 * rest >= from_ppqn)
+
+
+class IntervalIndex:
+    """
+    Nested containment list of the notes of a NoteBuffer.
+
+    Notes are laid out in lists where no note contains another, so starts and ends both grow along a list and the ones
+    overlapping [start, end) are found with two bisects. The notes a note contains are in its own list, searched only
+    if the note overlaps, so a long note does not make the query walk the notes under it
+    """
+
+    __slots__ = ("order", "top", "starts", "ends", "ranks", "first", "last")
+
+    # index of the note in the buffer, in order of start
+    order: array
+    # the first `top` slots are the outer list
+    top: int
+    # by slot
+    starts: array
+    ends: array
+    # position of the note in `order`
+    ranks: array
+    # slots of the list of notes contained in the note
+    first: array
+    last: array
+
+    def __init__(self, buffer: NoteBuffer) -> None:
+        order = sorted(range(len(buffer)), key=buffer.start.__getitem__)
+        starts = [buffer.start[i] for i in order]
+        ends = [buffer.end[i] for i in order]
+
+        # by rank, children[0] is the outer list and children[rank + 1] the notes contained in the note
+        children: list[list[int]] = [[] for _ in range(len(order) + 1)]
+        parents: list[int] = []
+        for rank in sorted(range(len(order)), key=lambda rank: (starts[rank], -ends[rank])):
+            while parents and ends[parents[-1]] < ends[rank]:
+                parents.pop()
+
+            children[parents[-1] + 1 if parents else 0].append(rank)
+            parents.append(rank)
+
+        layout = list(children[0])
+        first = array("q", [0]) * len(order)
+        last = array("q", [0]) * len(order)
+        for slot in range(len(order)):
+            first[slot] = len(layout)
+            layout.extend(children[layout[slot] + 1])
+            last[slot] = len(layout)
+
+        self.order = array("q", order)
+        self.top = len(children[0])
+        self.starts = array("q", [starts[rank] for rank in layout])
+        self.ends = array("q", [ends[rank] for rank in layout])
+        self.ranks = array("q", layout)
+        self.first = first
+        self.last = last
+
+    def overlapping(self, start: int, end: int) -> Iterator[int]:
+        """
+        Yields buffer indexes of notes overlapping [start, end), in order of their start
+        """
+        starts, ends, first, last = self.starts, self.ends, self.first, self.last
+
+        ranks = []
+        pending = [(0, self.top)]
+        while pending:
+            lo, hi = pending.pop()
+            lo = bisect_right(ends, start, lo, hi)
+            hi = bisect_left(starts, end, lo, hi)
+
+            ranks.extend(self.ranks[lo:hi])
+            pending.extend((first[slot], last[slot]) for slot in range(lo, hi) if first[slot] < last[slot])
+
+        ranks.sort()
+        for rank in ranks:
+            yield self.order[rank]
+
+
+class NoteBuffer:
+    """
+    Structure of arrays store of notes. A note is a row across the columns.
+
+    `start` and `end` are in PPQN ticks, `pitch` is the midi value of the note. Change the columns through the methods,
+    they keep the interval index in sync
+    """
+
+    __slots__ = ("start", "end", "pitch", "velocity", "channel", "_index", "_min_start", "_max_end")
+
+    start: array
+    end: array
+    pitch: array
+    velocity: array
+    channel: array
+
+    _index: IntervalIndex | None
+
+    # running bounds of the notes, None while the buffer is empty
+    _min_start: int | None
+    _max_end: int | None
+
+    def __init__(self) -> None:
+        self.start = array("q")
+        self.end = array("q")
+        self.pitch = array("h")
+        self.velocity = array("h")
+        self.channel = array("b")
+
+        self._index = None
+
+        self._min_start = None
+        self._max_end = None
+
+    @classmethod
+    def from_columns(cls, start: array, end: array, pitch: array, velocity: array, channel: array) -> NoteBuffer:
+        """
+        Makes a buffer of the given columns, without copying them. Columns have to be of the same length and type as
+        the ones of NoteBuffer
+        """
+        buffer = cls()
+        buffer.start, buffer.end, buffer.pitch, buffer.velocity, buffer.channel = start, end, pitch, velocity, channel
+
+        if start:
+            buffer._min_start = min(start)
+            buffer._max_end = max(end)
+
+        return buffer
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+
+        return (
+            self.start == other.start
+            and self.end == other.end
+            and self.pitch == other.pitch
+            and self.velocity == other.velocity
+            and self.channel == other.channel
+        )
+
+    def __repr__(self) -> str:
+        return f"NoteBuffer(notes={len(self)})"
+
+    def append(self, start: int, end: int, pitch: int, velocity: int, channel: int) -> None:
+        self.start.append(start)
+        self.end.append(end)
+        self.pitch.append(pitch)
+        self.velocity.append(velocity)
+        self.channel.append(channel)
+
+        self._index = None
+        self._update_bounds(start, end)
+
+    def extend(self, other: NoteBuffer, offset: int = 0, channel: int | None = None, count: int | None = None) -> None:
+        """
+        Appends the first `count` notes of `other`, all of them by default, shifted by `offset` ticks. If `channel` is
+        given, it overrides the channel of the appended notes
+        """
+        if count is None or count >= len(other):
+            start, end, pitch, velocity = other.start, other.end, other.pitch, other.velocity
+            channels = other.channel
+            min_start, max_end = other.min_start, other.max_end
+        else:
+            start, end, pitch, velocity = (
+                other.start[:count],
+                other.end[:count],
+                other.pitch[:count],
+                other.velocity[:count],
+            )
+            channels = other.channel[:count]
+            min_start, max_end = min(start, default=0), max(end, default=0)
+
+        if offset:
+            self.start.extend(array("q", [tick + offset for tick in start]))
+            self.end.extend(array("q", [tick + offset for tick in end]))
+        else:
+            self.start.extend(start)
+            self.end.extend(end)
+
+        self.pitch.extend(pitch)
+        self.velocity.extend(velocity)
+
+        if channel is None:
+            self.channel.extend(channels)
+        else:
+            self.channel.extend(array("b", [channel]) * len(start))
+
+        self._index = None
+        if start:
+            self._update_bounds(min_start + offset, max_end + offset)
+
+    def extend_view(self, view: BufferView) -> None:
+        self.extend(view.buffer, offset=view.offset, channel=view.channel, count=view.count)
+
+    def _update_bounds(self, start: int, end: int) -> None:
+        if self._min_start is None or start < self._min_start:
+            self._min_start = start
+
+        if self._max_end is None or end > self._max_end:
+            self._max_end = end
+
+    @property
+    def min_start(self) -> int:
+        """
+        Earliest start of the notes, 0 if there are none
+        """
+        return self._min_start if self._min_start is not None else 0
+
+    @property
+    def max_end(self) -> int:
+        """
+        Latest end of the notes, 0 if there are none
+        """
+        return self._max_end if self._max_end is not None else 0
+
+    def set_channel(self, channel: int) -> None:
+        self.channel = array("b", [channel]) * len(self)
+
+    def overlapping(self, start: int, end: int) -> Iterator[int]:
+        """
+        Yields indexes of notes overlapping [start, end), in order of their start. Notes ending at `start` or starting at
+        `end` do not overlap
+        """
+        if self._index is None:
+            self._index = IntervalIndex(self)
+
+        return self._index.overlapping(start, end)
+
+    def order(self) -> array:
+        """
+        Returns indexes of the notes, sorted by start
+        """
+        if self._index is None:
+            self._index = IntervalIndex(self)
+
+        return self._index.order
+
+    def row(self, index: int) -> tuple[int, int, int, int, int]:
+        """
+        Returns (start, end, pitch, velocity, channel) of the note at `index`
+        """
+        return self.start[index], self.end[index], self.pitch[index], self.velocity[index], self.channel[index]
+
+    def rows(self) -> Iterator[tuple[int, int, int, int, int]]:
+        return zip(self.start, self.end, self.pitch, self.velocity, self.channel)
+
+    def copy(self) -> NoteBuffer:
+        buffer = NoteBuffer()
+        buffer.extend(self)
+        return buffer
+
+
+class BufferView(NamedTuple):
+    """
+    The first `count` notes of `buffer`, shifted by `offset` ticks and moved to `channel` if it is not None.
+
+    Buffers only grow, so a view keeps showing the notes it was made with. `min_start` and `max_end` are the bounds of
+    the view, with the offset applied
+    """
+
+    buffer: NoteBuffer
+    count: int
+    offset: int = 0
+    channel: int | None = None
+    min_start: int = 0
+    max_end: int = 0
+
+    @classmethod
+    def of(cls, buffer: NoteBuffer) -> BufferView:
+        return cls(buffer, len(buffer), min_start=buffer.min_start, max_end=buffer.max_end)
+
+    def shifted(self, offset: int, channel: int | None = None) -> BufferView:
+        return self._replace(
+            offset=self.offset + offset,
+            channel=self.channel if channel is None else channel,
+            min_start=self.min_start + offset,
+            max_end=self.max_end + offset,
+        )
+
+    def sorted_rows(self) -> Iterator[tuple[int, int, int, int, int]]:
+        """
+        Yields (start, end, pitch, velocity, channel) of the notes of the view, sorted by start
+        """
+        buffer = self.buffer
+
+        for i in buffer.order():
+            if i >= self.count:
+                continue
+
+            yield (
+                buffer.start[i] + self.offset,
+                buffer.end[i] + self.offset,
+                buffer.pitch[i],
+                buffer.velocity[i],
+                buffer.channel[i] if self.channel is None else self.channel,
+            )
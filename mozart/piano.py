@@ -4,6 +4,7 @@ import random
 
 from mozart.player import Clip, PlayedNote
 from mozart.primitives import Chord, MidiNote, TimeSignature
+from mozart.profiling import profiled
 
 
 class PianoChordArticulator:
@@ -30,9 +31,7 @@ class PianoChordArticulator:
         max_velocity = self.intensity * 25
 
         for note in notes:
-            _n = note.copy()
-            _n.velocity = random.randint(max_velocity - 20, max_velocity)
-            _notes.append(_n)
+            _notes.append(note.with_velocity(random.randint(max_velocity - 20, max_velocity)))
 
         return _notes
 
@@ -61,6 +60,7 @@ class PianoChordArticulator:
 
         return played_notes
 
+    @profiled()
     def articulate_slow_arp_with_bass(self, chord: Chord, sloppyness: int = 0) -> Clip:
         """
         Arpiggiating chord articulator
@@ -81,9 +81,8 @@ class PianoChordArticulator:
 
             # play 1 and the 5  of the chord on beat 1, with a lowerd ocatave left hand
             if beat == 0:
-                _1, _5 = notes[0].copy(), notes[2].copy()
-                _1.octave -= 1
-                _5.octave -= 1
+                _1 = notes[0].with_octave(notes[0].octave - 1)
+                _5 = notes[2].with_octave(notes[2].octave - 1)
 
                 played_notes.append(
                     PlayedNote(
@@ -114,6 +113,7 @@ class PianoChordArticulator:
 
         return Clip(played_notes=played_notes, _ends_at=self.time_signature.numerator)
 
+    @profiled()
     def articulate_quick_arp(self, chord: Chord, sloppyness: int = 0) -> Clip:
         # v1 cannout articulate chrods shorted than 3 notes
         if len(chord.notes) < 3:
@@ -129,6 +129,7 @@ class PianoChordArticulator:
 
         return Clip(played_notes=played_notes, _ends_at=self.time_signature.numerator)
 
+    @profiled()
     def articulate_arp_with_bass(self, chord: Chord, sloppyness: int = 0) -> Clip:
         # v1 cannout articulate chrods shorted than 3 notes
         if len(chord.notes) < 3:
@@ -144,11 +145,9 @@ class PianoChordArticulator:
 
         for i, note in enumerate(notes):
             if i in lower_octave:
-                _n = note.copy()
-                _n.octave -= 1
                 played_notes.append(
                     PlayedNote(
-                        note=_n,
+                        note=note.with_octave(note.octave - 1),
                         starts_at=0,
                         ends_at=random.randint(1, 2),
                     )
@@ -1,14 +1,24 @@
 from __future__ import annotations
 
+import asyncio
 import copy
+import heapq
 import time
+from bisect import bisect_right
+from collections.abc import Iterable, Iterator, Sequence
 from dataclasses import dataclass, field
-from operator import attrgetter
 
 import mido
 
-import math
+from mozart import ports
+from mozart.engine import OutputEngine
+from mozart.notebuffer import PPQN, BufferView, NoteBuffer, beats_to_ticks, convert_ticks, ticks_to_beats
+from mozart.ports import DEFAULT_PORT, PortRegistry
 from mozart.primitives import MidiNote
+from mozart.profiling import profiled
+from mozart.scheduler import DEFAULT_SPIN, wait_until
+from mozart.stats import TimingStats, TimingSummary
+from mozart.timeline import NOTE_OFF, NOTE_ON, TempoMap, Timeline, note_events
 
 
 @dataclass
@@ -41,7 +51,26 @@ class PlayedNote:
             raise ValueError("Midi channel has to be between 1 and 16")
 
     def copy(self) -> PlayedNote:
-        return copy.deepcopy(self)
+        # MidiNote is immutable, so a shallow copy is enough
+        return copy.copy(self)
+
+    @classmethod
+    def from_ticks(cls, note: MidiNote, start_tick: int, end_tick: int, midi_channel: int = 3) -> PlayedNote:
+        """
+        Makes a note that starts and ends at PPQN ticks
+        """
+        starts_at, starts_at_offset = ticks_to_beats(start_tick)
+        ends_at, ends_at_offset = ticks_to_beats(end_tick)
+
+        return cls(note, starts_at, ends_at, starts_at_offset, ends_at_offset, midi_channel)
+
+    @property
+    def start_tick(self) -> int:
+        return beats_to_ticks(self.starts_at, self.starts_at_offset)
+
+    @property
+    def end_tick(self) -> int:
+        return beats_to_ticks(self.ends_at, self.ends_at_offset)
 
     @property
     def effective_start(self) -> float:
@@ -52,32 +81,154 @@ class PlayedNote:
         return self.ends_at + (self.ends_at_offset / 100)
 
 
-@dataclass
+class PlayedNoteView(Sequence):
+    """
+    Read only sequence of PlayedNote over a NoteBuffer.
+
+    Notes are created on access, so changing them does not change the buffer
+    """
+
+    def __init__(self, buffer: NoteBuffer) -> None:
+        self._buffer = buffer
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        return played_note_from_row(*self._buffer.row(index))
+
+    def __iter__(self) -> Iterator[PlayedNote]:
+        for row in self._buffer.rows():
+            yield played_note_from_row(*row)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+def played_note_from_row(start: int, end: int, pitch: int, velocity: int, channel: int) -> PlayedNote:
+    """
+    Makes a PlayedNote out of a NoteBuffer row
+    """
+    played_note = PlayedNote.from_ticks(MidiNote.from_midi(pitch, velocity), start, end)
+
+    # Track.render uses channel 0, which PlayedNote does not accept
+    played_note.midi_channel = channel
+
+    return played_note
+
+
+def make_note_buffer(notes: Iterable[PlayedNote]) -> NoteBuffer:
+    buffer = NoteBuffer()
+    for note in notes:
+        buffer.append(
+            note.start_tick,
+            note.end_tick,
+            note.note.midi,
+            note.note.velocity,
+            note.midi_channel,
+        )
+
+    return buffer
+
+
 class Clip:
     """
+    Notes are stored in `notes`, a NoteBuffer. `played_notes` is a read only view of them as PlayedNote, change notes
+    with `append`, `extend` and `set_midi_channel`
+
+    `concat` does not copy notes, it keeps views of the appended clip and notes are copied only when they are read.
+    Buffers can be shared between clips this way, so do not change `notes` directly
+
     Issues
     - If ends_at is offsetted high, Clip.ends_at will not take the offset into account
     """
 
-    _ends_at: int | None = None
-    played_notes: list[PlayedNote] = field(default_factory=list)
+    _ends_at: int | None
+    _notes: NoteBuffer
+
+    # concatenated notes, that are yet to be copied into _notes
+    _views: list[BufferView]
+
+    def __init__(
+        self,
+        _ends_at: int | None = None,
+        played_notes: Iterable[PlayedNote] = (),
+        notes: NoteBuffer | None = None,
+    ) -> None:
+        self._ends_at = _ends_at
+        self._notes = notes if notes is not None else NoteBuffer()
+        self._views = []
+        self.extend(played_notes)
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+
+        return self._ends_at == other._ends_at and self.notes == other.notes
+
+    def __repr__(self) -> str:
+        return f"Clip(_ends_at={self._ends_at!r}, notes={self.notes!r})"
+
+    @property
+    def notes(self) -> NoteBuffer:
+        if self._views:
+            notes = self._notes.copy()
+            for view in self._views:
+                notes.extend_view(view)
+
+            self._notes = notes
+            self._views = []
+
+        return self._notes
+
+    @property
+    def played_notes(self) -> PlayedNoteView:
+        return PlayedNoteView(self.notes)
 
     @property
     def starts_at(self) -> int:
-        if not self.played_notes:
+        if self.is_empty:
             return 0
 
-        return min(self.played_notes, key=attrgetter("starts_at")).starts_at
+        return min(view.min_start for view in self.views()) // PPQN
 
     @property
     def ends_at(self) -> int:
-        if not self.played_notes:
+        if self.is_empty:
             return 0
 
         if self._ends_at:
             return self._ends_at
 
-        return max(self.played_notes, key=attrgetter("ends_at")).ends_at
+        return max(view.max_end for view in self.views()) // PPQN
+
+    @property
+    def is_empty(self) -> bool:
+        return not self._notes and not self._views
+
+    def views(self) -> list[BufferView]:
+        """
+        Returns views over all notes of the clip, without copying them
+        """
+        if not self._notes:
+            return list(self._views)
+
+        return [BufferView.of(self._notes), *self._views]
+
+    def append(self, note: PlayedNote):
+        self.extend([note])
+
+    def extend(self, notes: Iterable[PlayedNote]):
+        self.notes.extend(make_note_buffer(notes))
+
+    def set_midi_channel(self, midi_channel: int):
+        # copy, as the buffer might be viewed by other clips
+        notes = self.notes.copy()
+        notes.set_channel(midi_channel)
+        self._notes = notes
 
     def round_up_to_nearest_bar(self, beats_per_bar: int):
         """
@@ -89,15 +240,11 @@ class Clip:
 
         self._ends_at = self.ends_at + (beats_per_bar - (self.ends_at % beats_per_bar))
 
+    @profiled()
     def concat(self, clip: Clip) -> Clip:
         ends_at = self.ends_at
 
-        for note in clip.played_notes:
-            _n = note.copy()
-            _n.starts_at += ends_at
-            _n.ends_at += ends_at
-            self.played_notes.append(_n)
-
+        self._views.extend(view.shifted(ends_at * PPQN) for view in clip.views())
         self._ends_at = ends_at + clip.ends_at
 
         return self
@@ -110,153 +257,464 @@ class Clip:
         """
         new_clip = Clip()
 
-        for note in self.played_notes:
+        start_tick = start_beat * PPQN
+        end_tick = end_beat * PPQN
 
-            # note ends before the start_beat or right at it
-            if note.effective_end < start_beat or math.isclose(note.effective_end, start_beat):
-                continue
+        for index in self.notes.overlapping(start_tick, end_tick):
+            start, end, pitch, velocity, channel = self.notes.row(index)
+
+            start = max(start, start_tick) - start_tick
+            end = min(end, end_tick) - start_tick
 
-            # note starts after the end_beat or right at it
-            if note.effective_start > end_beat or math.isclose(note.effective_start, end_beat):
+            if start >= end:
                 continue
 
-            _n = note.copy()
+            new_clip.notes.append(start, end, pitch, velocity, channel)
 
-            if _n.effective_start < start_beat or math.isclose(_n.effective_start, start_beat):
-                _n.starts_at = 0
-                _n.starts_at_offset = 0
-            else:
-                start = _n.effective_start - start_beat
-                start_offset = (start - int(start)) * 100
-                _n.starts_at = int(start)
-                _n.starts_at_offset = start_offset
-
-            if _n.effective_end > end_beat or math.isclose(_n.effective_end, end_beat):
-                _n.ends_at = end_beat - start_beat
-                _n.ends_at_offset = 0
-            else:
-                end = _n.effective_end - start_beat
-                end_offset = (end - int(end)) * 100
-                _n.ends_at = int(end)
-                _n.ends_at_offset = end_offset
+        return new_clip
 
-            if math.isclose(_n.effective_start, _n.effective_end, abs_tol=0.01):
-                continue
+    def split_at(self, beats: list[int]) -> list[Clip]:
+        """
+        Splits the clip at `beats` into the consecutive clips [0, beats[0]), [beats[0], beats[1]) ... [beats[-1], end),
+        where end is the beat the last note ends in, rounded up, or ends_at if that is later
+
+        Each clip is the same as `cut` over its window, but all of them are made in a single pass over the notes
+        """
+        edges = [0, *beats, self._last_beat()]
+        if any(end <= start for start, end in zip(edges, edges[1:])):
+            raise ValueError("Beats to split at have to be increasing and within the clip")
 
-            new_clip.played_notes.append(_n)
+        return self._split([beat * PPQN for beat in edges])
 
-        return new_clip
+    def split_into_bars(self, beats_per_bar: int) -> list[Clip]:
+        """
+        Splits the clip into clips of one bar each. The last bar is a whole one, even if the clip ends before it
+        """
+        bars = -(-self._last_beat() // beats_per_bar)
+
+        return self._split([bar * beats_per_bar * PPQN for bar in range(bars + 1)])
+
+    def _last_beat(self) -> int:
+        """
+        ends_at, or the end of the last note rounded up to a beat if that is later. ends_at rounds it down
+        """
+        if self.is_empty:
+            return self.ends_at
+
+        return max(self.ends_at, -(-max(view.max_end for view in self.views()) // PPQN))
+
+    def _split(self, edges: list[int]) -> list[Clip]:
+        """
+        `edges` are the boundaries of the windows in ticks
+        """
+        clips = [Clip() for _ in range(len(edges) - 1)]
+
+        for index in self.notes.overlapping(edges[0], edges[-1]):
+            start, end, pitch, velocity, channel = self.notes.row(index)
+
+            window = max(bisect_right(edges, start) - 1, 0)
+            while window < len(clips) and edges[window] < end:
+                start_tick, end_tick = edges[window], edges[window + 1]
+
+                _start = max(start, start_tick) - start_tick
+                _end = min(end, end_tick) - start_tick
+
+                if _start < _end:
+                    clips[window].notes.append(_start, _end, pitch, velocity, channel)
+
+                window += 1
+
+        return clips
 
     def copy(self) -> Clip:
-        return copy.deepcopy(self)
+        clip = Clip(_ends_at=self._ends_at, notes=self._notes.copy())
+        clip._views = list(self._views)
+        return clip
 
 
 @dataclass
 class Track:
+    """
+    Place clips with `append` and `put`, they keep the clips sorted by start to find overlaps.
+
+    Clips are placed with the length they had at the time, so changing a clip after placing it can make it overlap
+    """
+
     midi_channel: int = 0
     # start, clip
     clips: dict[int, Clip] = field(default_factory=dict)
 
+    # start and end of the clips, sorted by start
+    _starts: list[int] = field(default_factory=list, init=False, repr=False, compare=False)
+    _ends: list[int] = field(default_factory=list, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        for start in sorted(self.clips):
+            self._starts.append(start)
+            self._ends.append(start + self.clips[start].ends_at)
+
+    @property
+    def ends_at(self) -> int:
+        """
+        Beat at which the last clip ends
+        """
+        return self._ends[-1] if self._ends else 0
+
     def append(self, clip: Clip):
-        last_clip_start = max(self.clips.keys(), default=0)
-        last_clip_end = self.clips[last_clip_start].ends_at + last_clip_start if last_clip_start in self.clips else 0
-        self.clips[last_clip_end] = clip
+        self.put(clip, self.ends_at)
 
     def put(self, clip: Clip, start_beat: int):
         """
         Puts the clip at the start_beat
 
-        Raises ValueError if the clip overlaps with another clip
+        Raises ValueError if the clip overlaps with another clip. A clip of no length at start_beat, such as an empty
+        one, does not overlap and is replaced
         """
+        ends_at = start_beat + clip.ends_at
+        i = bisect_right(self._starts, start_beat)
 
-        for _start, _clip in self.clips.items():
-            if start_beat > _start and start_beat < _start + _clip.ends_at:
-                raise ValueError("Clip overlaps with existing clip")
+        if i > 0 and self._starts[i - 1] == start_beat == self._ends[i - 1]:
+            i -= 1
+            del self._starts[i]
+            del self._ends[i]
+            del self.clips[start_beat]
 
+        # clip starting before start_beat or at it, ends after start_beat
+        if i > 0 and (self._ends[i - 1] > start_beat or self._starts[i - 1] == start_beat):
+            raise ValueError("Clip overlaps with existing clip")
+
+        # next clip starts before the end of this one
+        if i < len(self._starts) and self._starts[i] < ends_at:
+            raise ValueError("Clip overlaps with existing clip")
+
+        self._starts.insert(i, start_beat)
+        self._ends.insert(i, ends_at)
         self.clips[start_beat] = clip
 
+    def render_buffer(self) -> NoteBuffer:
+        """
+        Returns notes of all clips, placed at their start and set to the midi_channel of the track
+        """
+        buffer = NoteBuffer()
+
+        for start, clip in self.clips.items():
+            for view in clip.views():
+                buffer.extend_view(view.shifted(start * PPQN, self.midi_channel))
+
+        return buffer
+
+    @profiled()
     def render(self) -> list[PlayedNote]:
-        notes: list[PlayedNote] = []
+        return list(PlayedNoteView(self.render_buffer()))
+
+    def render_stream(self) -> Iterator[tuple[int, int, int, int, int]]:
+        """
+        Yields (start, end, pitch, velocity, channel) of the notes of all clips, sorted by start.
 
+        Clips are merged as they are read, nothing is copied up front
+        """
+        streams = []
         for start, clip in self.clips.items():
-            for note in clip.played_notes:
-                _n = note.copy()
-                _n.midi_channel = self.midi_channel
-                _n.starts_at += start
-                _n.ends_at += start
-                notes.append(_n)
+            for view in clip.views():
+                streams.append(view.shifted(start * PPQN, self.midi_channel).sorted_rows())
+
+        return heapq.merge(*streams)
+
+    def render_events(self) -> Iterator[tuple[int, int, int, int]]:
+        """
+        Yields (tick, status, note, velocity) note_on and note_off events of the track, sorted by tick
+        """
+        return note_events(self.render_stream())
 
-        return notes
+
+def make_message(status: int, note: int, velocity: int) -> mido.Message:
+    _type = "note_on" if status & 0xF0 == NOTE_ON else "note_off"
+    return mido.Message(_type, note=note, velocity=velocity, channel=status & 0x0F)
 
 
 class Player:
     ticks_per_beat: int = 16
     bpm: int = 80
-    lenght_of_tick = -1
 
-    outport = None
+    port_name: str = DEFAULT_PORT
+    backend: str = "mido"
+    registry: PortRegistry
+
+    timeline: Timeline
+    tempo_map: TempoMap
+    timing: TimingStats
+
+    _outport = None
 
-    _rendered_notes: dict[int, list[mido.Message]] = {}
+    # set while play_async is running, see pause and resume
+    _paused: asyncio.Event | None = None
+    _resumed: asyncio.Event | None = None
+
+    def __init__(
+        self,
+        bpm: int = 80,
+        port_name: str = DEFAULT_PORT,
+        backend: str = "mido",
+        registry: PortRegistry = ports.registry,
+        ticks_per_beat: int = 16,
+    ) -> None:
+        """
+        The output port is opened the first time it is used, through `registry`. Players on the same port share it
+
+        `ticks_per_beat` is the resolution notes are rendered at. `bpm` is the starting tempo, change it later on with
+        `set_tempo`
+        """
+        if ticks_per_beat < 1 or ticks_per_beat > PPQN:
+            raise ValueError(f"ticks_per_beat has to be between 1 and {PPQN}")
 
-    def __init__(self, bpm: int = 80) -> None:
         self.bpm = bpm
+        self.ticks_per_beat = ticks_per_beat
 
-        # 80 beats in 60 sec
-        # 1 beat in 60/80 sec
-        # 100 tick in 60/80 sec
-        # 1 tick in 60/(80*100) sec
-        self.lenght_of_tick = 60 / (self.bpm * self.ticks_per_beat)
+        self.port_name = port_name
+        self.backend = backend
+        self.registry = registry
 
-        self.outport = mido.open_output("pyMidiPort 1")
+        self.timeline = Timeline()
+        self.tempo_map = TempoMap(bpm, ticks_per_beat)
+        self.timing = TimingStats()
 
     def __del__(self):
-        if self.outport:
-            self.outport.close()
-
-    def render(self, notes: list[PlayedNote]):
-        for note in notes:
-
-            # Note start message
-            start_at = note.starts_at * self.ticks_per_beat
-            start_at_offset = round(self.ticks_per_beat * (note.starts_at_offset / 100))
-            if start_at + start_at_offset >= 0:
-                start_at = start_at + start_at_offset
-
-            start_message = mido.Message(
-                "note_on",
-                note=note.note.midi,
-                velocity=note.note.velocity,
-                channel=note.midi_channel,
-            )
-            if start_at in self._rendered_notes:
-                self._rendered_notes[start_at].append(start_message)
-            else:
-                self._rendered_notes[start_at] = [start_message]
+        self.close()
+
+    @property
+    def outport(self):
+        if self._outport is None:
+            self._outport = self.registry.acquire(self.port_name, self.backend)
 
-            # note end message
-            ends_at = note.ends_at * self.ticks_per_beat
-            ends_at_offset = round(self.ticks_per_beat * (note.ends_at_offset / 100))
-            if ends_at + ends_at_offset >= 0:
-                ends_at = ends_at + ends_at_offset
+        return self._outport
 
-            end_message = mido.Message("note_off", note=note.note.midi, velocity=0, channel=note.midi_channel)
-            if ends_at in self._rendered_notes:
-                self._rendered_notes[ends_at].append(end_message)
-            else:
-                self._rendered_notes[ends_at] = [end_message]
+    def close(self):
+        """
+        Releases the output port
+        """
+        if self._outport is not None:
+            self._outport = None
+            self.registry.release(self.port_name, self.backend)
+
+    def to_tick(self, tick: int) -> int:
+        """
+        Converts PPQN ticks to ticks of the player
+        """
+        return max(convert_ticks(tick, PPQN, self.ticks_per_beat), 0)
+
+    def stats(self) -> TimingSummary:
+        """
+        Returns how late events were sent, see TimingStats. Reset with `timing.reset()`
+        """
+        return self.timing.summary()
+
+    def set_tempo(self, beat: int, bpm: float):
+        """
+        Changes the tempo to `bpm` from `beat` on
+        """
+        self.tempo_map.set_tempo(beat * self.ticks_per_beat, bpm)
+
+    @profiled()
+    def render(self, notes: Iterable[PlayedNote] | NoteBuffer):
+        """
+        Adds notes to the timeline. Notes shorter than a tick of the player are made a tick long, so they are not turned
+        off before they are turned on
+
+        Raises ValueError if a note is not on a midi channel, 0-15
+        """
+        if not isinstance(notes, NoteBuffer):
+            notes = make_note_buffer(notes)
+
+        for start, end, pitch, velocity, channel in notes.rows():
+            if channel < 0 or channel > 15:
+                raise ValueError(f"Invalid midi channel: {channel}")
+
+            start_tick = self.to_tick(start)
+            self.timeline.add(start_tick, NOTE_ON | channel, pitch, velocity)
+            self.timeline.add(max(self.to_tick(end), start_tick + 1), NOTE_OFF | channel, pitch, 0)
+
+    def render_events(self, events: Iterable[tuple[int, int, int, int]]):
+        """
+        Adds (tick, status, note, velocity) events, such as the ones of Track.render_events. Ticks are PPQN ticks
+
+        As in render, a note that ends within the tick it started at is turned off a tick later
+        """
+        # (channel, note) : tick of the last note_on
+        started: dict[tuple[int, int], int] = {}
+
+        for tick, status, note, velocity in events:
+            tick = self.to_tick(tick)
+            key = (status & 0x0F, note)
+
+            if status & 0xF0 == NOTE_ON and velocity:
+                started[key] = tick
+            elif key in started:
+                tick = max(tick, started.pop(key) + 1)
+
+            self.timeline.add(tick, status, note, velocity)
+
+    def clear(self):
+        """
+        Removes all rendered notes
+        """
+        self.timeline.clear()
+
+    def play(self, spin: float = DEFAULT_SPIN, start_beat: int = 0, end_beat: int | None = None, loop: int = 1):
+        """
+        Sends events at their time, going straight from one tick with events to the next.
+
+        Plays from `start_beat` till `end_beat`, the end by default, `loop` times. Notes that are still sounding at the
+        end of each loop are turned off
+
+        Deadlines are counted from the start of play, so time spent sending does not make later events drift. Set
+        `spin` to 0 to sleep all the way to each deadline instead of busy waiting the last bit
+        """
+
+        if not self.timeline:
+            return
+
+        # (channel, note)
+        sounding: set[tuple[int, int]] = set()
+        started_at = time.perf_counter()
+
+        for at, start, stop in self._cues(start_beat, end_beat, loop):
+            wait_until(started_at + at, spin)
+            self._send(start, stop, sounding, started_at + at)
+
+    def play_ahead(self, lookahead_beats: int = 8):
+        """
+        Same as play, but sends from an OutputEngine thread that is fed `lookahead_beats` ahead of playback
+        """
+        lookahead = self.tempo_map.seconds(lookahead_beats * self.ticks_per_beat)
+        engine = OutputEngine(self.outport, lookahead=lookahead, stats=self.timing)
+        engine.start()
+
+        try:
+            self.schedule(engine)
+        finally:
+            engine.stop()
+
+    def schedule(self, engine: OutputEngine, start_beat: int = 0):
+        """
+        Queues the rendered events on `engine`, starting `start_beat` beats, following the tempo map, after the start of
+        the engine. Blocks till the last event is within the lookahead of the engine
+        """
+        offset = self.tempo_map.seconds(start_beat * self.ticks_per_beat)
+
+        for tick, start, stop in self.timeline.groups():
+            at = offset + self.tempo_map.seconds(tick)
+            for _, status, note, velocity in self.timeline.events(start, stop):
+                engine.schedule(at, make_message(status, note, velocity))
+
+    async def play_async(self, start_beat: int = 0, end_beat: int | None = None, loop: int = 1):
+        """
+        Same as play, but awaits the deadlines, so other tasks, including other players, run in between.
+
+        Cancel the task to stop playing. `pause` and `resume` pause it. Notes that are sounding are turned off when it
+        is stopped or paused
+        """
+
+        if not self.timeline:
+            return
+
+        self._paused = asyncio.Event()
+        self._resumed = asyncio.Event()
+
+        # (channel, note)
+        sounding: set[tuple[int, int]] = set()
+        started_at = time.perf_counter()
 
-    def play(self):
+        try:
+            for at, start, stop in self._cues(start_beat, end_beat, loop):
+                while True:
+                    timeout = started_at + at - time.perf_counter()
+                    try:
+                        await asyncio.wait_for(self._paused.wait(), timeout=max(timeout, 0))
+                    except asyncio.TimeoutError:
+                        break
 
-        if not self._rendered_notes:
+                    paused_at = time.perf_counter()
+                    self._silence(sounding)
+
+                    await self._resumed.wait()
+                    self._paused.clear()
+                    self._resumed.clear()
+
+                    # time does not pass while paused
+                    started_at += time.perf_counter() - paused_at
+
+                self._send(start, stop, sounding, started_at + at)
+
+        finally:
+            self._silence(sounding)
+            self._paused = None
+            self._resumed = None
+
+    def pause(self):
+        """
+        Pauses play_async
+        """
+        if self._paused:
+            self._paused.set()
+
+    def resume(self):
+        """
+        Resumes play_async after pause
+        """
+        if self._paused and self._paused.is_set():
+            self._resumed.set()
+
+    def _cues(self, start_beat: int, end_beat: int | None, loop: int) -> Iterator[tuple[float, int, int]]:
+        """
+        Yields (seconds since the start of play, start, stop) for each group of events to send, [start, stop) being
+        their indexes in the timeline. The end of each loop is yielded with no events, start == stop
+
+        Seeking is a binary search into the timeline, every loop reuses the same events
+        """
+        start_tick = start_beat * self.ticks_per_beat
+        start = self.timeline.seek(start_tick)
+
+        if end_beat is None:
+            end_tick = self.timeline.ends_at
+            stop = len(self.timeline)
+        else:
+            end_tick = end_beat * self.ticks_per_beat
+            stop = self.timeline.seek(end_tick)
+
+        if end_tick < start_tick or loop < 1:
+            raise ValueError(f"Can not play from {start_beat} to {end_beat}, {loop} times")
+
+        offset = self.tempo_map.seconds(start_tick)
+        length = self.tempo_map.seconds(end_tick) - offset
+
+        for i in range(loop):
+            for tick, _start, _stop in self.timeline.groups(start, stop):
+                yield i * length + self.tempo_map.seconds(tick) - offset, _start, _stop
+
+            yield (i + 1) * length, stop, stop
+
+    def _send(self, start: int, stop: int, sounding: set[tuple[int, int]], deadline: float):
+        """
+        Sends events from index `start` to `stop`, that were due at `deadline`, and keeps track of the notes sounding.
+        Turns sounding notes off if there are no events
+        """
+        if start == stop:
+            self._silence(sounding)
             return
 
-        total_ticks = max(self._rendered_notes.keys()) + 1
+        for _, status, note, velocity in self.timeline.events(start, stop):
+            sent_at = time.perf_counter()
+            self.outport.send(make_message(status, note, velocity))
+            self.timing.record(deadline, sent_at, time.perf_counter() - sent_at)
+
+            # a note_on with velocity 0 is a note_off
+            if status & 0xF0 == NOTE_ON and velocity:
+                sounding.add((status & 0x0F, note))
+            else:
+                sounding.discard((status & 0x0F, note))
 
-        for i in range(0, total_ticks):
-            _start = time.perf_counter()
-            if i in self._rendered_notes:
-                for note in self._rendered_notes[i]:
-                    self.outport.send(note)
-            _end = time.perf_counter()
+    def _silence(self, sounding: set[tuple[int, int]]):
+        for channel, note in sounding:
+            self.outport.send(make_message(NOTE_OFF | channel, note, 0))
 
-            time.sleep(self.lenght_of_tick - (_end - _start))
+        sounding.clear()
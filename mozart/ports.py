@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import threading
+from typing import Callable
+
+import mido
+
+DEFAULT_PORT = "pyMidiPort 1"
+
+
+class NullPort:
+    """
+    Output port that discards messages
+    """
+
+    name: str
+    closed: bool = False
+
+    def __init__(self, name: str = "") -> None:
+        self.name = name
+
+    def send(self, message: mido.Message):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class MemoryPort(NullPort):
+    """
+    Output port that keeps the messages sent to it in `messages`
+    """
+
+    messages: list[mido.Message]
+
+    def __init__(self, name: str = "") -> None:
+        super().__init__(name)
+        self.messages = []
+
+    def send(self, message: mido.Message):
+        self.messages.append(message)
+
+
+def open_mido_port(name: str):
+    return mido.open_output(name)
+
+
+class PortRegistry:
+    """
+    Opens output ports on first use and shares them. There is one port per (backend, name), it is closed when the last
+    user releases it
+
+    Backends are callables that take the name of the port and open it. `mido`, `null` and `memory` are registered
+    """
+
+    _backends: dict[str, Callable[[str], object]]
+    # (backend, name) : [port, number of users]
+    _ports: dict[tuple[str, str], list]
+
+    def __init__(self) -> None:
+        self._backends = {"mido": open_mido_port, "null": NullPort, "memory": MemoryPort}
+        self._ports = {}
+        self._lock = threading.Lock()
+
+    def register_backend(self, backend: str, opener: Callable[[str], object]):
+        self._backends[backend] = opener
+
+    def acquire(self, name: str = DEFAULT_PORT, backend: str = "mido"):
+        if backend not in self._backends:
+            raise ValueError(f"Unknown port backend: {backend}")
+
+        with self._lock:
+            entry = self._ports.get((backend, name))
+            if entry is None:
+                entry = self._ports[(backend, name)] = [self._backends[backend](name), 0]
+
+            entry[1] += 1
+            return entry[0]
+
+    def release(self, name: str = DEFAULT_PORT, backend: str = "mido"):
+        with self._lock:
+            entry = self._ports.get((backend, name))
+            if entry is None:
+                return
+
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+
+            del self._ports[(backend, name)]
+
+        entry[0].close()
+
+    def is_open(self, name: str = DEFAULT_PORT, backend: str = "mido") -> bool:
+        return (backend, name) in self._ports
+
+
+registry = PortRegistry()
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import copy
 import re
 from dataclasses import dataclass
 from enum import Enum
@@ -66,11 +65,66 @@ class Note(Enum):
         return MidiNote(note=self, octave=octave)
 
 
-@dataclass
 class MidiNote:
+    """
+    Immutable, interned midi note.
+
+    Instances are pooled by (midi, velocity), so constructing the same note twice returns the same object. Use
+    `with_octave`, `with_velocity`, `sharpen` and `flatten` to derive new notes.
+    """
+
+    __slots__ = ("note", "octave", "velocity")
+
     note: Note
-    octave: int = 0
-    velocity: int = 100
+    octave: int
+    velocity: int
+
+    # (midi, velocity) : note
+    _pool: dict[tuple[int, int], MidiNote] = {}
+
+    def __new__(cls, note: Note, octave: int = 0, velocity: int = 100) -> MidiNote:
+        key = (note.value + (12 * octave), velocity)
+
+        instance = cls._pool.get(key)
+        if instance is None:
+            instance = object.__new__(cls)
+            object.__setattr__(instance, "note", note)
+            object.__setattr__(instance, "octave", octave)
+            object.__setattr__(instance, "velocity", velocity)
+            cls._pool[key] = instance
+
+        return instance
+
+    @classmethod
+    def from_midi(cls, midi: int, velocity: int = 100) -> MidiNote:
+        return cls(Note(midi % 12), midi // 12, velocity)
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable, can not set {name}")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable, can not delete {name}")
+
+    def __reduce__(self):
+        return (type(self), (self.note, self.octave, self.velocity))
+
+    def __copy__(self) -> MidiNote:
+        return self
+
+    def __deepcopy__(self, memo) -> MidiNote:
+        return self
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+
+        return self.midi == other.midi and self.velocity == other.velocity
+
+    def __hash__(self) -> int:
+        return hash((self.midi, self.velocity))
+
+    def __repr__(self) -> str:
+        return f"MidiNote(note={self.note!r}, octave={self.octave!r}, velocity={self.velocity!r})"
 
     @property
     def midi(self) -> int:
@@ -82,20 +136,27 @@ class MidiNote:
 
         return MidiNote(next_note, next_note_octave)
 
-    def sharpen(self, semitone: int = 1):
+    def with_octave(self, octave: int) -> MidiNote:
+        return MidiNote(self.note, octave, self.velocity)
+
+    def with_velocity(self, velocity: int) -> MidiNote:
+        return MidiNote(self.note, self.octave, velocity)
+
+    def sharpen(self, semitone: int = 1) -> MidiNote:
         # TODO: Add boundry checks
-        self.octave += (self.note.value + semitone) // 12
-        self.note = Note((self.note.value + semitone) % 12)
-        return self
+        octave = self.octave + (self.note.value + semitone) // 12
+        return MidiNote(Note((self.note.value + semitone) % 12), octave, self.velocity)
 
-    def flatten(self, semitone: int = 1):
+    def flatten(self, semitone: int = 1) -> MidiNote:
         # TODO: Add boundry checks
-        self.octave = self.octave + (self.note.value - semitone) // 12
-        self.note = Note((self.note.value - semitone) % 12)
-        return self
+        octave = self.octave + (self.note.value - semitone) // 12
+        return MidiNote(Note((self.note.value - semitone) % 12), octave, self.velocity)
 
     def copy(self) -> MidiNote:
-        return copy.deepcopy(self)
+        """
+        Notes are immutable, so a copy is the note itself
+        """
+        return self
 
     def distance(self, note: MidiNote) -> int:
         """
@@ -124,8 +185,7 @@ class Scale:
 
         note = self.notes[position % 7]
         if position // 7 > 0:
-            note = note.copy()
-            note.octave += position // 7
+            note = note.with_octave(note.octave + position // 7)
 
         return note
 
@@ -137,8 +197,7 @@ class Scale:
         note = self.notes[position % 7]
 
         if position // 7 > 0:
-            note = note.copy()
-            note.octave += position // 7
+            note = note.with_octave(note.octave + position // 7)
 
         return note
 
@@ -169,11 +228,7 @@ class Chord:
 
         note = self.scale.get_note_by_distance(self.degree - 1, degree - 1)
         if argumentation:
-            note = note.copy()
-            if argumentation == "flat":
-                note.flatten()
-            else:
-                note.sharpen()
+            note = note.flatten() if argumentation == "flat" else note.sharpen()
 
         self.notes.append(note)
         return self
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import contextlib
+import functools
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, Protocol, TypeVar
+
+F = TypeVar("F", bound=Callable)
+
+
+class Sink(Protocol):
+    def record(self, name: str, wall: float, allocated: int) -> None:
+        ...
+
+
+@dataclass
+class SpanStats:
+    calls: int = 0
+    # seconds, including nested spans
+    wall: float = 0.0
+    # memory blocks allocated and not freed by the end of the span, see sys.getallocatedblocks()
+    allocated: int = 0
+
+
+class CollectingSink:
+    """
+    Sums up spans by name
+    """
+
+    spans: dict[str, SpanStats]
+
+    def __init__(self) -> None:
+        self.spans = {}
+
+    def record(self, name: str, wall: float, allocated: int) -> None:
+        stats = self.spans.get(name)
+        if stats is None:
+            stats = self.spans[name] = SpanStats()
+
+        stats.calls += 1
+        stats.wall += wall
+        stats.allocated += allocated
+
+    def clear(self):
+        self.spans.clear()
+
+    def report(self) -> str:
+        lines = [f"{'span':<40} {'calls':>8} {'wall ms':>10} {'allocated':>10}"]
+        for name, stats in sorted(self.spans.items(), key=lambda item: -item[1].wall):
+            lines.append(f"{name:<40} {stats.calls:>8} {stats.wall * 1000:>10.3f} {stats.allocated:>10}")
+
+        return "\n".join(lines)
+
+
+# spans are recorded only while there is a sink
+_sink: Sink | None = None
+
+_disabled = contextlib.nullcontext()
+
+
+def enable(sink: Sink | None = None) -> Sink:
+    """
+    Starts recording spans into `sink`, a new CollectingSink by default, and returns it
+    """
+    global _sink
+    _sink = sink if sink is not None else CollectingSink()
+    return _sink
+
+
+def disable():
+    global _sink
+    _sink = None
+
+
+def is_enabled() -> bool:
+    return _sink is not None
+
+
+@contextlib.contextmanager
+def _span(name: str, sink: Sink):
+    blocks = sys.getallocatedblocks()
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        sink.record(name, time.perf_counter() - started_at, sys.getallocatedblocks() - blocks)
+
+
+def span(name: str):
+    """
+    Context manager recording the block as span `name`. Does nothing while profiling is disabled
+    """
+    if _sink is None:
+        return _disabled
+
+    return _span(name, _sink)
+
+
+def profiled(name: str | None = None) -> Callable[[F], F]:
+    """
+    Decorator recording calls of the function as span `name`, the qualified name of the function by default. While
+    profiling is disabled it costs a global lookup per call
+    """
+
+    def decorator(function: F) -> F:
+        span_name = name or f"{function.__module__}.{function.__qualname__}"
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _sink is None:
+                return function(*args, **kwargs)
+
+            with _span(span_name, _sink):
+                return function(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
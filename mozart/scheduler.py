@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+import time
+
+# time.sleep can wake up a millisecond or more late, busy wait this many seconds before a deadline instead
+DEFAULT_SPIN = 0.0005
+
+
+def wait_until(deadline: float, spin: float = DEFAULT_SPIN) -> None:
+    """
+    Waits until `deadline`, a time.perf_counter() value. Sleeps till `spin` seconds before it and busy waits the rest.
+    Returns right away if the deadline has passed
+    """
+    remaining = deadline - time.perf_counter()
+    if remaining > spin:
+        time.sleep(remaining - spin)
+
+    while time.perf_counter() < deadline:
+        pass
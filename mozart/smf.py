@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import heapq
+import mmap
+import struct
+from array import array
+from dataclasses import dataclass, field
+from operator import itemgetter
+from typing import BinaryIO, Container, Iterable, Iterator
+
+from mido import bpm2tempo
+
+from mozart.notebuffer import PPQN, convert_ticks
+from mozart.primitives import TimeSignature
+
+META_TEMPO = 0x51
+META_TIME_SIGNATURE = 0x58
+
+# data bytes following a status byte, by the high nibble of channel messages and by the whole byte of system messages
+DATA_LENGTHS = {0x80: 2, 0x90: 2, 0xA0: 2, 0xB0: 2, 0xC0: 1, 0xD0: 1, 0xE0: 2, 0xF1: 1, 0xF2: 2, 0xF3: 1}
+
+
+def encode_varlen(value: int) -> bytes:
+    """
+    Encodes `value` as a midi variable length quantity
+    """
+    data = [value & 0x7F]
+    value >>= 7
+
+    while value:
+        data.append((value & 0x7F) | 0x80)
+        value >>= 7
+
+    return bytes(reversed(data))
+
+
+class MidiFileWriter:
+    """
+    Writes (tick, status, note, velocity) events, in time order, to a type 0 midi file as they come.
+
+    Events are flushed to disk every `buffer_size` bytes and the length of the track is filled in on `close`, so memory
+    does not grow with the length of the song. Ticks of the events are in `source_ppqn`, PPQN by default as in
+    Track.render_events, and are converted to the `ticks_per_beat` of the file
+    """
+
+    ticks_per_beat: int
+    source_ppqn: int
+    buffer_size: int
+
+    _file: BinaryIO
+    # position of the length of the track chunk
+    _length_at: int
+    _length: int
+    _buffer: bytearray
+    _last_tick: int
+    _last_status: int | None
+
+    def __init__(
+        self,
+        filepath: str,
+        ticks_per_beat: int = PPQN,
+        bpm: int | None = None,
+        time_signature: TimeSignature | None = None,
+        buffer_size: int = 1 << 16,
+        source_ppqn: int = PPQN,
+    ) -> None:
+        self.ticks_per_beat = ticks_per_beat
+        self.source_ppqn = source_ppqn
+        self.buffer_size = buffer_size
+
+        self._file = open(filepath, "wb")
+        self._file.write(b"MThd" + struct.pack(">IHHH", 6, 0, 1, ticks_per_beat))
+        self._file.write(b"MTrk")
+        self._length_at = self._file.tell()
+        self._file.write(struct.pack(">I", 0))
+
+        self._length = 0
+        self._buffer = bytearray()
+        self._last_tick = 0
+        self._last_status = None
+
+        if bpm:
+            self._write_meta(0, 0x51, bpm2tempo(bpm).to_bytes(3, "big"))
+
+        if time_signature:
+            denominator = time_signature.denominator.bit_length() - 1
+            self._write_meta(0, 0x58, bytes([time_signature.numerator, denominator, 24, 8]))
+
+    def __enter__(self) -> MidiFileWriter:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, tick: int, status: int, note: int, velocity: int):
+        if self.source_ppqn != self.ticks_per_beat:
+            tick = convert_ticks(tick, self.source_ppqn, self.ticks_per_beat)
+
+        # notes that start before 0 are played at 0, as Player does
+        tick = max(tick, 0)
+        if tick < self._last_tick:
+            raise ValueError("Events have to be written in time order")
+
+        self._buffer += encode_varlen(tick - self._last_tick)
+        if status != self._last_status:
+            self._buffer.append(status)
+
+        self._buffer += bytes((note, velocity))
+
+        self._last_tick = tick
+        self._last_status = status
+
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def write_events(self, events: Iterable[tuple[int, int, int, int]]):
+        for event in events:
+            self.write(*event)
+
+    def flush(self):
+        self._file.write(self._buffer)
+        self._length += len(self._buffer)
+        self._buffer = bytearray()
+
+    def close(self):
+        if self._file.closed:
+            return
+
+        self._write_meta(self._last_tick, 0x2F, b"")
+        self.flush()
+
+        self._file.seek(self._length_at)
+        self._file.write(struct.pack(">I", self._length))
+        self._file.close()
+
+    def _write_meta(self, tick: int, meta_type: int, data: bytes):
+        self._buffer += encode_varlen(tick - self._last_tick)
+        self._buffer += bytes((0xFF, meta_type)) + encode_varlen(len(data)) + data
+
+        self._last_tick = tick
+        # meta events cancel running status
+        self._last_status = None
+
+
+@dataclass
+class SmfTrack:
+    """
+    Note events of a track chunk in columns, ticks are absolute and in the resolution of the file
+    """
+
+    tick: array = field(default_factory=lambda: array("q"))
+    status: array = field(default_factory=lambda: array("B"))
+    note: array = field(default_factory=lambda: array("B"))
+    velocity: array = field(default_factory=lambda: array("B"))
+
+    # (tick, meta type, data) of tempo and time signature events
+    meta: list[tuple[int, int, bytes]] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.tick)
+
+
+@dataclass
+class SmfFile:
+    ticks_per_beat: int
+    tracks: list[SmfTrack]
+
+    def events(self) -> Iterator[tuple[int, int, int, int]]:
+        """
+        Yields (tick, status, note, velocity) of the note events of all tracks in time order. Events at the same tick
+        are ordered by track, as in mido.merge_tracks
+        """
+        columns = [zip(track.tick, track.status, track.note, track.velocity) for track in self.tracks if len(track)]
+        if len(columns) == 1:
+            return columns[0]
+
+        return heapq.merge(*columns, key=itemgetter(0))
+
+    def last_meta(self, meta_type: int) -> bytes | None:
+        """
+        Data of the last meta event of `meta_type`, in the order of `events`
+        """
+        last = None
+        for track in self.tracks:
+            for tick, _type, data in track.meta:
+                if _type == meta_type and (last is None or tick >= last[0]):
+                    last = (tick, data)
+
+        return last[1] if last else None
+
+
+def read_smf(filepath: str, tracks: Container[int] | None = None) -> SmfFile:
+    """
+    Decodes the note, tempo and time signature events of a midi file, without creating an object per event. If
+    `tracks` is given, only the track chunks at those indexes are decoded and the others are left empty.
+
+    The file is memory mapped and read through a memoryview. Other events are skipped, as are chunks other than MTrk
+    """
+    with open(filepath, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        with memoryview(mapped) as data:
+            if data[:4] != b"MThd":
+                raise ValueError("Not a midi file")
+
+            header_length, _format, _tracks, ticks_per_beat = struct.unpack_from(">IHHH", data, 4)
+            if ticks_per_beat & 0x8000:
+                raise ValueError("SMPTE time division is not supported")
+
+            decoded = []
+            position = 8 + header_length
+
+            while position + 8 <= len(data):
+                length = int.from_bytes(data[position + 4 : position + 8], "big")
+                if position + 8 + length > len(data):
+                    raise ValueError("Truncated track chunk")
+
+                if data[position : position + 4] == b"MTrk":
+                    if tracks is None or len(decoded) in tracks:
+                        decoded.append(read_track(data, position + 8, position + 8 + length))
+                    else:
+                        decoded.append(SmfTrack())
+
+                position += 8 + length
+
+    return SmfFile(ticks_per_beat, decoded)
+
+
+def read_track(data: memoryview, position: int, end: int) -> SmfTrack:
+    """
+    Decodes the track chunk between `position` and `end` of `data`. Raises ValueError if an event runs past the end
+    """
+    # reading past the end of the chunk raises IndexError, instead of reading into the next chunk
+    with data[:end] as chunk:
+        try:
+            return _read_events(chunk, position, len(chunk))
+        except IndexError:
+            raise ValueError("Truncated track chunk") from None
+
+
+def _read_events(data: memoryview, position: int, end: int) -> SmfTrack:
+    track = SmfTrack()
+    tick = 0
+    status = 0
+
+    while position < end:
+        # delta time, a variable length quantity
+        byte = data[position]
+        position += 1
+        delta = byte & 0x7F
+        while byte & 0x80:
+            byte = data[position]
+            position += 1
+            delta = (delta << 7) | (byte & 0x7F)
+
+        tick += delta
+
+        byte = data[position]
+        if byte & 0x80:
+            position += 1
+            # meta events do not set running status
+            if byte != 0xFF:
+                status = byte
+        elif not status:
+            raise ValueError("Running status without a previous status")
+        else:
+            byte = status
+
+        if byte == 0xFF or byte == 0xF0 or byte == 0xF7:
+            meta_type = data[position] if byte == 0xFF else None
+            if meta_type is not None:
+                position += 1
+
+            length = data[position] & 0x7F
+            while data[position] & 0x80:
+                position += 1
+                length = (length << 7) | (data[position] & 0x7F)
+            position += 1
+
+            if position + length > end:
+                raise IndexError()
+
+            if meta_type == META_TEMPO or meta_type == META_TIME_SIGNATURE:
+                track.meta.append((tick, meta_type, bytes(data[position : position + length])))
+
+            position += length
+            continue
+
+        kind = byte & 0xF0
+        if kind == 0x80 or kind == 0x90:
+            track.tick.append(tick)
+            track.status.append(byte)
+            track.note.append(data[position])
+            track.velocity.append(data[position + 1])
+
+        position += DATA_LENGTHS.get(kind, 0) if kind != 0xF0 else DATA_LENGTHS.get(byte, 0)
+
+    if position > end:
+        raise IndexError()
+
+    return track
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+
+
+@dataclass
+class TimingSummary:
+    """
+    Lateness and send durations are in seconds, over the sends still in the buffer
+    """
+
+    # sends recorded since the last reset, including the ones no longer in the buffer
+    count: int
+    p50_lateness: float
+    p99_lateness: float
+    max_lateness: float
+    max_send_duration: float
+    # sends later than TimingStats.late_after since the last reset
+    late: int
+    dropped: int
+    sends_per_second: float
+
+
+class TimingStats:
+    """
+    Fixed size ring buffer of the last `size` sends: when each one was scheduled, when it was sent and how long sending
+    took. Recording a send is a few array writes, so it can stay on during playback
+    """
+
+    size: int
+    late_after: float
+
+    scheduled: array
+    sent: array
+    duration: array
+
+    count: int
+    late: int
+    dropped: int
+
+    def __init__(self, size: int = 4096, late_after: float = 0.002) -> None:
+        self.size = size
+        self.late_after = late_after
+        self.reset()
+
+    def reset(self):
+        self.scheduled = array("d", [0.0]) * self.size
+        self.sent = array("d", [0.0]) * self.size
+        self.duration = array("d", [0.0]) * self.size
+
+        self.count = 0
+        self.late = 0
+        self.dropped = 0
+
+    def record(self, scheduled: float, sent: float, duration: float):
+        i = self.count % self.size
+        self.scheduled[i] = scheduled
+        self.sent[i] = sent
+        self.duration[i] = duration
+
+        self.count += 1
+        if sent - scheduled > self.late_after:
+            self.late += 1
+
+    def drop(self, count: int = 1):
+        self.dropped += count
+
+    def summary(self) -> TimingSummary:
+        n = min(self.count, self.size)
+        lateness = sorted(self.sent[i] - self.scheduled[i] for i in range(n))
+
+        sent = self.sent[:n]
+        elapsed = max(sent, default=0) - min(sent, default=0)
+
+        return TimingSummary(
+            count=self.count,
+            p50_lateness=percentile(lateness, 50),
+            p99_lateness=percentile(lateness, 99),
+            max_lateness=lateness[-1] if lateness else 0.0,
+            max_send_duration=max(self.duration[:n], default=0.0),
+            late=self.late,
+            dropped=self.dropped,
+            sends_per_second=(n - 1) / elapsed if elapsed > 0 else 0.0,
+        )
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """
+    Nearest rank percentile of sorted `values`
+    """
+    if not values:
+        return 0.0
+
+    rank = max(round(percent / 100 * len(values)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
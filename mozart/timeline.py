@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right
+from heapq import heappop, heappush
+from typing import Iterable, Iterator
+
+# status bytes of channel 0, OR the midi channel (0-15) into them
+NOTE_OFF = 0x80
+NOTE_ON = 0x90
+
+
+def note_events(notes: Iterable[tuple[int, int, int, int, int]]) -> Iterator[tuple[int, int, int, int]]:
+    """
+    Turns (start, end, pitch, velocity, channel) notes sorted by start into (tick, status, note, velocity) events sorted
+    by tick. A note_off comes before the note_on of the same tick
+
+    Only the notes that are still sounding are held in memory
+    """
+
+    # (end, status, pitch)
+    sounding: list[tuple[int, int, int]] = []
+
+    for start, end, pitch, velocity, channel in notes:
+        while sounding and sounding[0][0] <= start:
+            tick, status, note = heappop(sounding)
+            yield tick, status, note, 0
+
+        heappush(sounding, (end, NOTE_OFF | channel, pitch))
+        yield start, NOTE_ON | channel, pitch, velocity
+
+    while sounding:
+        tick, status, note = heappop(sounding)
+        yield tick, status, note, 0
+
+
+class Timeline:
+    """
+    Compiled note events, as columns of tick, status, note and velocity. Add events in any order, `compile` sorts them
+    by tick, note_offs before note_ons of the same tick, and works out the delta of each event from the previous one
+    """
+
+    __slots__ = ("tick", "status", "note", "velocity", "delta", "_compiled")
+
+    tick: array
+    status: array
+    note: array
+    velocity: array
+    # ticks since the previous event, valid once compiled
+    delta: array
+
+    _compiled: bool
+
+    def __init__(self) -> None:
+        self.clear()
+
+    def __len__(self) -> int:
+        return len(self.tick)
+
+    def clear(self) -> None:
+        self.tick = array("q")
+        self.status = array("B")
+        self.note = array("B")
+        self.velocity = array("B")
+        self.delta = array("q")
+
+        self._compiled = True
+
+    def add(self, tick: int, status: int, note: int, velocity: int) -> None:
+        self.tick.append(tick)
+        self.status.append(status)
+        self.note.append(note)
+        self.velocity.append(velocity)
+
+        self._compiled = False
+
+    def compile(self) -> Timeline:
+        if self._compiled:
+            return self
+
+        tick, status = self.tick, self.status
+        order = sorted(range(len(tick)), key=lambda i: (tick[i], status[i] & 0xF0))
+
+        self.tick = array("q", [tick[i] for i in order])
+        self.status = array("B", [status[i] for i in order])
+        self.note = array("B", [self.note[i] for i in order])
+        self.velocity = array("B", [self.velocity[i] for i in order])
+        self.delta = array("q", [b - a for a, b in zip([0, *self.tick], self.tick)])
+
+        self._compiled = True
+        return self
+
+    @property
+    def ends_at(self) -> int:
+        """
+        Tick of the last event
+        """
+        self.compile()
+        return self.tick[-1] if self.tick else 0
+
+    def events(self, start: int = 0, stop: int | None = None) -> Iterator[tuple[int, int, int, int]]:
+        """
+        Yields (tick, status, note, velocity) of the events from index `start` to `stop`
+        """
+        self.compile()
+        stop = len(self) if stop is None else stop
+
+        for i in range(start, stop):
+            yield self.tick[i], self.status[i], self.note[i], self.velocity[i]
+
+    def seek(self, tick: int) -> int:
+        """
+        Returns the index of the first event at `tick` or after it
+        """
+        self.compile()
+        return bisect_left(self.tick, tick)
+
+    def groups(self, start: int = 0, stop: int | None = None) -> Iterator[tuple[int, int, int]]:
+        """
+        Yields (tick, start, stop) for every tick that has events, where [start, stop) are the indexes of its events.
+        Only events from index `start` to `stop` are grouped
+        """
+        self.compile()
+        stop = len(self) if stop is None else stop
+
+        for i in range(start + 1, stop + 1):
+            if i == stop or self.tick[i] != self.tick[start]:
+                yield self.tick[start], start, i
+                start = i
+
+
+class TempoMap:
+    """
+    Tempo of a song over time, as a list of tempo changes. `seconds` finds the change in effect at a tick with a binary
+    search, so looking up a time costs the same however many ticks or changes there are
+    """
+
+    ticks_per_beat: int
+
+    # tick of each change, its bpm and the seconds passed before it, sorted by tick
+    _ticks: list[int]
+    _bpms: list[float]
+    _seconds: list[float]
+
+    def __init__(self, bpm: float, ticks_per_beat: int) -> None:
+        self.ticks_per_beat = ticks_per_beat
+
+        self._ticks = [0]
+        self._bpms = [bpm]
+        self._seconds = [0.0]
+
+    def set_tempo(self, tick: int, bpm: float):
+        """
+        Changes the tempo to `bpm` from `tick` on, until the next change
+        """
+        if tick < 0 or bpm <= 0:
+            raise ValueError(f"Invalid tempo change: {bpm} bpm at {tick}")
+
+        i = bisect_right(self._ticks, tick)
+        if self._ticks[i - 1] == tick:
+            self._bpms[i - 1] = bpm
+        else:
+            self._ticks.insert(i, tick)
+            self._bpms.insert(i, bpm)
+            self._seconds.insert(i, 0.0)
+
+        for j in range(1, len(self._ticks)):
+            self._seconds[j] = self._seconds[j - 1] + self._to_seconds(self._ticks[j] - self._ticks[j - 1], j - 1)
+
+    def changes(self) -> list[tuple[int, float]]:
+        """
+        Returns (tick, bpm) of all tempo changes, the first one is at tick 0
+        """
+        return list(zip(self._ticks, self._bpms))
+
+    def bpm_at(self, tick: int) -> float:
+        return self._bpms[max(bisect_right(self._ticks, tick) - 1, 0)]
+
+    def seconds(self, tick: int) -> float:
+        """
+        Returns the seconds from tick 0 to `tick`
+        """
+        i = max(bisect_right(self._ticks, tick) - 1, 0)
+        return self._seconds[i] + self._to_seconds(tick - self._ticks[i], i)
+
+    def _to_seconds(self, ticks: int, change: int) -> float:
+        return ticks * 60 / (self._bpms[change] * self.ticks_per_beat)
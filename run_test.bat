@@ -1,4 +1,14 @@
 python -m unittest ^
     tests\test_primitives.py ^
     tests\test_player.py ^
-    tests\test_midifile.py
+    tests\test_midifile.py ^
+    tests\test_notebuffer.py ^
+    tests\test_timeline.py ^
+    tests\test_scheduler.py ^
+    tests\test_engine.py ^
+    tests\test_ports.py ^
+    tests\test_smf.py ^
+    tests\test_stats.py ^
+    tests\test_profiling.py ^
+    tests\test_cache.py ^
+    tests\test_library.py
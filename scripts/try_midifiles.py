@@ -23,8 +23,7 @@ def generate_chord_progession() -> Clip:
         chord.extend_many(["9"])
         clip.concat(art.articulate_quick_arp(chord, sloppyness=0))
 
-    for n in clip.played_notes:
-        n.midi_channel = 0
+    clip.set_midi_channel(0)
 
     return clip
 
@@ -38,8 +37,8 @@ def try_midi_file_read_with_chords():
     chord_clip = generate_chord_progession()
 
     player = Player(bpm=120)
-    player.render(midi_clip.clip.played_notes)
-    player.render(chord_clip.played_notes)
+    player.render(midi_clip.clip.notes)
+    player.render(chord_clip.notes)
 
     player.play()
 
@@ -48,11 +47,10 @@ def try_midi_file_read():
     path = r"tests\test_files\test_midi.mid"
 
     midi_clip = parse_midfile(path)
-    for n in midi_clip.clip.played_notes:
-        n.midi_channel = 0
+    midi_clip.clip.set_midi_channel(0)
 
     player = Player(bpm=120)
-    player.render(midi_clip.clip.played_notes)
+    player.render(midi_clip.clip.notes)
 
     player.play()
 
@@ -21,10 +21,9 @@ def dummy_play_progession():
         clip.concat(art.articulate_arp_with_bass(chord, sloppyness=0))
 
     print(clip.starts_at, clip.ends_at)
-    for c in clip.played_notes:
-        c.midi_channel = 0
+    clip.set_midi_channel(0)
 
-    player.render(clip.played_notes)
+    player.render(clip.notes)
     player.play()
 
 
@@ -24,8 +24,7 @@ def generate_chord_progession() -> Clip:
         chord.extend_many(["9"])
         clip.concat(art.articulate_quick_arp(chord, sloppyness=0))
 
-    for n in clip.played_notes:
-        n.midi_channel = 0
+    clip.set_midi_channel(0)
 
     return clip
 
@@ -44,8 +43,8 @@ def try_track():
     chord_track.put(chord_clip, 4)
 
     player = Player(bpm=100)
-    player.render(drum_track.render())
-    player.render(chord_track.render())
+    player.render(drum_track.render_buffer())
+    player.render(chord_track.render_buffer())
     player.play()
 
 
@@ -72,9 +71,9 @@ def trY_track_with_bass():
 
     # print(bass_track.clips)
     player = Player(bpm=140)
-    player.render(drum_track.render())
-    player.render(chord_track.render())
-    player.render(bass_track.render())
+    player.render(drum_track.render_buffer())
+    player.render(chord_track.render_buffer())
+    player.render(bass_track.render_buffer())
     player.play()
 
 
@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from expects import equal, expect, have_len
+
+from mozart.cache import ClipCache, dump_clip, load_clip
+from mozart.midifile import parse_midfile
+
+
+class TestPackedClip(unittest.TestCase):
+    def test_round_trip(self):
+        midi_clip = parse_midfile(os.path.join("tests", "test_files", "test_midi.mid"))
+        midi_clip.name = "drums"
+
+        expect(load_clip(dump_clip(midi_clip))).to(equal(midi_clip))
+
+    def test_invalid(self):
+        data = dump_clip(parse_midfile(os.path.join("tests", "test_files", "test_midi.mid")))
+
+        with self.assertRaises(ValueError):
+            load_clip(b"nope")
+
+        with self.assertRaises(ValueError):
+            load_clip(data[:-1])
+
+
+class TestClipCache(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+
+        self.filepath = os.path.join(tmp_dir.name, "clip.mid")
+        shutil.copy(os.path.join("tests", "test_files", "test_midi.mid"), self.filepath)
+
+        self.cache_dir = os.path.join(tmp_dir.name, "cache")
+        self.parsed = []
+
+    def parser(self, filepath):
+        self.parsed.append(filepath)
+        return parse_midfile(filepath)
+
+    def test_load(self):
+        cache = ClipCache(self.cache_dir, parser=self.parser)
+
+        first = cache.load(self.filepath)
+        second = ClipCache(self.cache_dir, parser=self.parser).load(self.filepath)
+
+        expect(second).to(equal(first))
+        expect(self.parsed).to(have_len(1))
+        expect((cache.hits, cache.misses)).to(equal((0, 1)))
+
+    def test_changed_file(self):
+        cache = ClipCache(self.cache_dir, parser=self.parser)
+        cache.load(self.filepath)
+
+        stat = os.stat(self.filepath)
+        os.utime(self.filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        cache.load(self.filepath)
+
+        expect(self.parsed).to(have_len(2))
+
+    def test_hash_content(self):
+        cache = ClipCache(self.cache_dir, hash_content=True, parser=self.parser)
+        cache.load(self.filepath)
+
+        copy = self.filepath + ".copy.mid"
+        shutil.copy(self.filepath, copy)
+        cache.load(copy)
+
+        expect(self.parsed).to(have_len(1))
+
+    def test_corrupt_entry(self):
+        cache = ClipCache(self.cache_dir, parser=self.parser)
+        cache.load(self.filepath)
+
+        for name in os.listdir(self.cache_dir):
+            with open(os.path.join(self.cache_dir, name), "wb") as file:
+                file.write(b"MZC1")
+
+        expect(cache.load(self.filepath)).to(equal(parse_midfile(self.filepath)))
+        expect(self.parsed).to(have_len(2))
+
+    def test_evict(self):
+        size = len(dump_clip(parse_midfile(self.filepath)))
+        cache = ClipCache(self.cache_dir, max_bytes=3 * size, parser=self.parser)
+
+        for i in range(4):
+            copy = f"{self.filepath}.{i}.mid"
+            shutil.copy(self.filepath, copy)
+            cache.load(copy)
+
+        # evicted down to 3/4 of max_bytes
+        expect(os.listdir(self.cache_dir)).to(have_len(2))
+        expect(cache.size).to(equal(2 * size))
+
+        # the first ones were evicted
+        cache.load(f"{self.filepath}.3.mid")
+        cache.load(f"{self.filepath}.0.mid")
+        expect(self.parsed).to(have_len(5))
+
+        expect(ClipCache(self.cache_dir).size).to(equal(cache.size))
+
+        cache.clear()
+        expect(os.listdir(self.cache_dir)).to(have_len(0))
+        expect(cache.size).to(equal(0))
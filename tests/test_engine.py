@@ -0,0 +1,88 @@
+import time
+import unittest
+from unittest.mock import MagicMock
+
+import mido
+from expects import be_above_or_equal, be_below, equal, expect
+
+from mozart.engine import OutputEngine
+from mozart.stats import TimingStats
+
+
+class TestOutputEngine(unittest.TestCase):
+    def setUp(self) -> None:
+        self.sent: list[tuple[float, mido.Message]] = []
+
+        self.outport = MagicMock()
+        self.outport.send.side_effect = lambda message: self.sent.append((time.perf_counter(), message))
+
+        self.messages = [mido.Message("note_on", note=60 + i) for i in range(3)]
+
+    def test_sends_in_time(self):
+        engine = OutputEngine(self.outport)
+        engine.start()
+        started_at = engine.started_at
+
+        for i, message in enumerate(self.messages):
+            engine.schedule(i * 0.01, message)
+
+        engine.stop()
+
+        expect([message for _, message in self.sent]).to(equal(self.messages))
+        for i, (sent_at, _) in enumerate(self.sent):
+            expect(sent_at).to(be_above_or_equal(started_at + i * 0.01))
+
+    def test_schedule_waits_for_lookahead(self):
+        engine = OutputEngine(self.outport, lookahead=0.05)
+        engine.start()
+        started_at = engine.started_at
+
+        engine.schedule(0.1, self.messages[0])
+        expect(time.perf_counter()).to(be_above_or_equal(started_at + 0.05))
+
+        engine.stop()
+        expect(self.sent).to(equal([(self.sent[0][0], self.messages[0])]))
+
+    def test_stop_without_drain(self):
+        engine = OutputEngine(self.outport, lookahead=10)
+        engine.start()
+
+        note_on = mido.Message("note_on", channel=2, note=50, velocity=100)
+        engine.schedule(0, note_on)
+        engine.schedule(3, mido.Message("note_off", channel=2, note=50))
+
+        # the thread has taken the message and waits for it to be due
+        while not engine._queue.empty():
+            time.sleep(0.001)
+
+        stopping_at = time.perf_counter()
+        engine.stop(drain=False)
+
+        expect(time.perf_counter() - stopping_at).to(be_below(1))
+
+        # the scheduled note_off is dropped, but the note is still turned off
+        expect([message for _, message in self.sent]).to(equal([note_on, mido.Message("note_off", channel=2, note=50)]))
+
+    def test_stats(self):
+        stats = TimingStats()
+        engine = OutputEngine(self.outport, stats=stats)
+        engine.start()
+
+        for i, message in enumerate(self.messages):
+            engine.schedule(i * 0.01, message)
+
+        engine.stop()
+
+        expect(stats.summary().count).to(equal(3))
+        expect(stats.summary().p50_lateness).to(be_above_or_equal(0))
+
+    def test_stats_dropped(self):
+        stats = TimingStats()
+        engine = OutputEngine(self.outport, lookahead=10, stats=stats)
+        engine.start()
+
+        engine.schedule(0.5, self.messages[0])
+        engine.schedule(1, self.messages[1])
+        engine.stop(drain=False)
+
+        expect(stats.summary().dropped).to(be_above_or_equal(1))
@@ -0,0 +1,143 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from expects import equal, expect, have_len
+from mido import Message, MetaMessage, MidiFile, bpm2tempo
+
+from mozart.library import ClipLibrary, describe
+from mozart.notebuffer import PPQN
+from mozart.primitives import TimeSignature
+
+
+def write_drums(filepath: str, bpm: int, bars: int):
+    mid = MidiFile(ticks_per_beat=96)
+    track = mid.add_track()
+    track.append(MetaMessage("set_tempo", tempo=bpm2tempo(bpm)))
+    track.append(MetaMessage("time_signature", numerator=3, denominator=4))
+
+    for _ in range(bars * 3):
+        track.append(Message("note_on", channel=9, note=36, velocity=100, time=0))
+        track.append(Message("note_off", channel=9, note=36, time=48))
+        track.append(Message("note_on", channel=9, note=42, velocity=100, time=0))
+        track.append(Message("note_off", channel=9, note=42, time=48))
+
+    mid.save(filepath)
+
+
+class TestClipLibrary(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+
+        self.clips_dir = os.path.join(tmp_dir.name, "midi_clips")
+        os.makedirs(os.path.join(self.clips_dir, "drums"))
+
+        self.melody = os.path.join(self.clips_dir, "melody.mid")
+        shutil.copy(os.path.join("tests", "test_files", "test_midi.mid"), self.melody)
+
+        self.drums = [os.path.join(self.clips_dir, "drums", f"{bpm}.mid") for bpm in (90, 100, 120)]
+        for filepath, bars in zip(self.drums, (2, 4, 4)):
+            write_drums(filepath, int(os.path.basename(filepath)[:-4]), bars)
+
+        self.broken = os.path.join(self.clips_dir, "broken.mid")
+        with open(self.broken, "wb") as file:
+            file.write(b"not midi")
+
+        self.library = ClipLibrary(os.path.join(tmp_dir.name, "index.sqlite"))
+        self.addCleanup(self.library.close)
+
+    def test_describe(self):
+        info = describe(self.melody)
+
+        expect((info.bpm, info.time_signature, info.notes)).to(equal((120, TimeSignature(4, 4), 16)))
+        expect((info.beats, info.bars)).to(equal((11.75, 3)))
+        expect((info.pitch_min, info.pitch_max)).to(equal((36, 47)))
+        expect(info.has_drums).to(equal(False))
+
+        drums = describe(self.drums[1])
+        expect((drums.bars, drums.density, drums.drum_notes)).to(equal((4, 6.0, frozenset({36, 42}))))
+        expect(drums.has_drums).to(equal(True))
+
+    def test_describe_same_pitch_on_two_channels(self):
+        mid = MidiFile(ticks_per_beat=96)
+        mid.add_track().extend(
+            [
+                Message("note_on", channel=9, note=36, velocity=100, time=0),
+                Message("note_on", channel=0, note=36, velocity=100, time=0),
+                Message("note_off", channel=9, note=36, time=48),
+                Message("note_off", channel=0, note=36, time=336),
+            ]
+        )
+        filepath = os.path.join(self.clips_dir, "kick_and_bass.mid")
+        mid.save(filepath)
+
+        info = describe(filepath)
+        expect((info.notes, info.beats, info.bars)).to(equal((2, 4.0, 1)))
+        expect((info.channels, info.drum_notes)).to(equal(((1 << 9) | 1, frozenset({36}))))
+
+    def test_load_same_pitch_on_two_channels(self):
+        mid = MidiFile(ticks_per_beat=96)
+        mid.add_track().extend(
+            [
+                MetaMessage("set_tempo", tempo=bpm2tempo(95)),
+                Message("note_on", channel=9, note=36, velocity=100, time=0),
+                Message("note_on", channel=0, note=36, velocity=100, time=0),
+                Message("note_off", channel=9, note=36, time=48),
+                Message("note_off", channel=0, note=36, time=336),
+            ]
+        )
+        mid.save(os.path.join(self.clips_dir, "kick_and_bass.mid"))
+
+        result = self.library.scan(self.clips_dir, processes=1)
+        expect(result.failed).to(have_len(1))
+
+        found = self.library.query(min_bpm=95, max_bpm=95, drum_notes=[36], channel=0)
+        expect(found).to(have_len(1))
+
+        notes = self.library.load(found[0]).clip.notes
+        expect(sorted(notes.rows())).to(equal([(0, PPQN // 2, 36, 100, 9), (0, 4 * PPQN, 36, 100, 0)]))
+
+    def test_scan(self):
+        result = self.library.scan(self.clips_dir, processes=2)
+
+        expect((result.indexed, result.unchanged, result.removed)).to(equal((4, 0, 0)))
+        expect(list(result.failed)).to(equal([os.path.abspath(self.broken)]))
+        expect(self.library).to(have_len(4))
+
+        os.remove(self.drums[0])
+        result = self.library.scan(self.clips_dir, processes=1)
+        expect((result.indexed, result.unchanged, result.removed)).to(equal((0, 3, 1)))
+        expect(self.library).to(have_len(3))
+
+    def test_query(self):
+        self.library.scan(self.clips_dir, processes=1)
+
+        found = self.library.query(time_signature=TimeSignature(3, 4), min_bpm=90, max_bpm=110, bars=4)
+        expect([info.path for info in found]).to(equal([os.path.abspath(self.drums[1])]))
+
+        expect(self.library.query(drums=True)).to(have_len(3))
+        expect(self.library.query(drums=False)).to(have_len(1))
+        expect(self.library.query(drum_notes=[36, 42], max_bars=3)).to(have_len(1))
+        expect(self.library.query(drum_notes=[38])).to(have_len(0))
+        expect(self.library.query(channel=0, min_pitch=36, max_pitch=50)).to(have_len(1))
+
+        expect(self.library.load(found[0]).bpm).to(equal(100))
+
+    def test_query_in_one_statement(self):
+        self.library.scan(self.clips_dir, processes=1)
+
+        statements = []
+        self.library.connection.set_trace_callback(statements.append)
+        found = self.library.query()
+
+        expect(statements).to(have_len(1))
+        expect({info.path: info.drum_notes for info in found}).to(
+            equal(
+                {
+                    **{os.path.abspath(filepath): frozenset({36, 42}) for filepath in self.drums},
+                    os.path.abspath(self.melody): frozenset(),
+                }
+            )
+        )
@@ -1,20 +1,56 @@
+import os
+import tempfile
 import unittest
 
-from expects import be_true, equal, expect, have_len
+from expects import be_true, contain, equal, expect, have_len
+from mido import Message, MetaMessage, MidiFile, bpm2tempo
 
 import math
-from mozart.midifile import parse_midfile
-from mozart.primitives import Note
+from mozart.midifile import export_midfile, export_tracks, import_tracks, parse_midfile, read_midfile
+from mozart.player import Player, Track
+from mozart.primitives import Note, TimeSignature
 
 
 class TestMidiFile(unittest.TestCase):
     def setUp(self) -> None:
-        self.midi_clip = parse_midfile(r"tests\test_files\test_midi.mid")
+        self.midi_clip = parse_midfile(os.path.join("tests", "test_files", "test_midi.mid"))
 
     def test_midi_clip_lenght(self):
         expect(self.midi_clip.clip.ends_at).to(equal(11))
         expect(self.midi_clip.clip.played_notes).to(have_len(16))
 
+    def test_meta(self):
+        expect(self.midi_clip.bpm).to(equal(120))
+        expect(self.midi_clip.time_signature).to(equal(TimeSignature(4, 4)))
+
+    def test_parse_ticks_per_beat(self):
+        mid = MidiFile(ticks_per_beat=480)
+        mid.add_track().extend(
+            [
+                MetaMessage("set_tempo", tempo=bpm2tempo(90), time=0),
+                Message("note_on", note=60, velocity=80, time=240),
+                # a note_on with velocity 0 ends the note
+                Message("note_on", note=60, velocity=0, time=720),
+            ]
+        )
+
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        filepath = os.path.join(tmp_dir.name, "480.mid")
+        mid.save(filepath)
+
+        midi_clip = parse_midfile(filepath)
+        expect(midi_clip.bpm).to(equal(90))
+
+        note = midi_clip.clip.played_notes[0]
+        expect((note.starts_at, note.starts_at_offset)).to(equal((0, 50)))
+        expect((note.ends_at, note.ends_at_offset)).to(equal((2, 0)))
+        # velocities in the file are not kept
+        expect(note.note.velocity).to(equal(100))
+
+    def test_read_midfile(self):
+        expect(read_midfile(os.path.join("tests", "test_files", "test_midi.mid"))).to(equal(self.midi_clip))
+
     def test_note_properties_bar_1(self):
         bar_1_notes = self.midi_clip.clip.played_notes[:5]
 
@@ -125,3 +161,104 @@ class TestMidiFile(unittest.TestCase):
         expect(a.ends_at_offset).to(equal(25.0))
         expect(a.effective_start).to(equal(8.0))
         expect(a.effective_end).to(equal(11.25))
+
+
+class TestExportMidiFile(unittest.TestCase):
+    def setUp(self) -> None:
+        clip = parse_midfile(os.path.join("tests", "test_files", "test_midi.mid")).clip
+
+        self.tracks = [Track(midi_channel=0), Track(midi_channel=9)]
+        self.tracks[0].append(clip)
+        self.tracks[1].append(clip.cut(0, 4))
+
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.filepath = os.path.join(tmp_dir.name, "export.mid")
+
+    def test_export_tracks(self):
+        export_tracks(self.tracks, self.filepath, bpm=120, time_signature=TimeSignature(3, 4))
+
+        mid = MidiFile(self.filepath)
+        expect(mid.type).to(equal(1))
+        expect(mid.tracks).to(have_len(3))
+
+        meta = {msg.type: msg for msg in mid.tracks[0]}
+        expect(meta["set_tempo"].tempo).to(equal(bpm2tempo(120)))
+        expect((meta["time_signature"].numerator, meta["time_signature"].denominator)).to(equal((3, 4)))
+
+        for track, channel, notes in zip(mid.tracks[1:], [0, 9], [16, 5]):
+            note_ons = [msg for msg in track if msg.type == "note_on"]
+            expect(note_ons).to(have_len(notes))
+            expect({msg.channel for msg in note_ons}).to(equal({channel}))
+
+    def test_read_exported(self):
+        export_tracks(self.tracks[:1], self.filepath, bpm=120, time_signature=TimeSignature(3, 4))
+
+        expect(read_midfile(self.filepath)).to(equal(parse_midfile(self.filepath)))
+
+    def test_export_tempo_map(self):
+        player = Player(bpm=100, backend="null")
+        player.set_tempo(4, 140)
+        player.render_events(self.tracks[0].render_events())
+        export_midfile(player, self.filepath)
+
+        mid = MidiFile(self.filepath)
+        tempos = [(msg.time, msg.tempo) for msg in mid.tracks[0] if msg.type == "set_tempo"]
+        expect(tempos).to(equal([(0, bpm2tempo(100)), (4 * player.ticks_per_beat, bpm2tempo(140))]))
+
+    def test_export_timing(self):
+        export_tracks(self.tracks[:1], self.filepath)
+
+        mid = MidiFile(self.filepath)
+        tick = 0
+        note_ons = []
+        for msg in mid.tracks[1]:
+            tick += msg.time
+            if msg.type == "note_on":
+                note_ons.append((tick, msg.note))
+
+        # D# of bar 1 starts at 1.5 beats, E of bar 2 at 6.125
+        expect(note_ons).to(contain((round(1.5 * mid.ticks_per_beat), 39)))
+        expect(note_ons).to(contain((round(6.125 * mid.ticks_per_beat), 40)))
+
+
+class TestImportTracks(unittest.TestCase):
+    def setUp(self) -> None:
+        mid = MidiFile(type=1, ticks_per_beat=96)
+        mid.add_track().append(MetaMessage("set_tempo", tempo=bpm2tempo(100)))
+        mid.add_track().extend(
+            [
+                # the same pitch on two channels at once
+                Message("note_on", channel=0, note=60, velocity=90, time=0),
+                Message("note_on", channel=1, note=60, velocity=70, time=48),
+                Message("note_off", channel=0, note=60, time=48),
+                Message("note_off", channel=1, note=60, time=96),
+            ]
+        )
+        mid.add_track().extend(
+            [
+                Message("note_on", channel=9, note=36, velocity=100, time=96),
+                Message("note_on", channel=9, note=36, velocity=0, time=48),
+            ]
+        )
+
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.filepath = os.path.join(tmp_dir.name, "arrangement.mid")
+        mid.save(self.filepath)
+
+    def test_import_tracks(self):
+        tracks = import_tracks(self.filepath)
+        expect(sorted(tracks)).to(equal([(1, 0), (1, 1), (2, 9)]))
+
+        notes = [
+            [(note.effective_start, note.effective_end, note.note.midi, note.midi_channel) for note in track.render()]
+            for track in tracks.values()
+        ]
+        expect(notes).to(equal([[(0, 1, 60, 0)], [(0.5, 2, 60, 1)], [(1, 1.5, 36, 9)]]))
+        expect(tracks[(1, 1)].midi_channel).to(equal(1))
+
+    def test_import_some_tracks(self):
+        tracks = import_tracks(self.filepath, tracks=[2])
+
+        expect(list(tracks)).to(equal([(2, 9)]))
@@ -0,0 +1,139 @@
+import random
+import unittest
+
+from expects import be_below, equal, expect, have_len
+
+from mozart.notebuffer import PPQN, BufferView, NoteBuffer, beats_to_ticks, convert_ticks, ticks_to_beats
+
+
+class CountingArray:
+    """
+    Sequence counting the reads of its items
+    """
+
+    def __init__(self, items) -> None:
+        self.items = items
+        self.reads = 0
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __getitem__(self, index):
+        self.reads += 1
+        return self.items[index]
+
+
+class TestNoteBuffer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.buffer = NoteBuffer()
+        self.buffer.append(0, PPQN, 60, 100, 1)
+        self.buffer.append(PPQN // 2, 2 * PPQN, 64, 90, 1)
+
+    def test_append(self):
+        expect(self.buffer).to(have_len(2))
+        expect(self.buffer.row(1)).to(equal((PPQN // 2, 2 * PPQN, 64, 90, 1)))
+
+    def test_extend_with_offset_and_channel(self):
+        buffer = self.buffer.copy()
+        buffer.extend(self.buffer, offset=4 * PPQN, channel=9)
+
+        expect(buffer).to(have_len(4))
+        expect(buffer.row(0)).to(equal(self.buffer.row(0)))
+        expect(buffer.row(2)).to(equal((4 * PPQN, 5 * PPQN, 60, 100, 9)))
+        expect(buffer.row(3)).to(equal((4 * PPQN + PPQN // 2, 6 * PPQN, 64, 90, 9)))
+
+    def test_set_channel(self):
+        buffer = self.buffer.copy()
+        buffer.set_channel(5)
+
+        expect(list(buffer.channel)).to(equal([5, 5]))
+        expect(list(self.buffer.channel)).to(equal([1, 1]))
+
+    def test_overlapping(self):
+        buffer = NoteBuffer()
+        buffer.append(0, 8 * PPQN, 36, 100, 1)  # long note, overlaps everything
+        buffer.append(3 * PPQN, 4 * PPQN, 38, 100, 1)
+        buffer.append(PPQN, 2 * PPQN, 42, 100, 1)
+        buffer.append(2 * PPQN, 3 * PPQN, 42, 100, 1)
+
+        expect(list(buffer.overlapping(2 * PPQN, 3 * PPQN))).to(equal([0, 3]))
+        expect(list(buffer.overlapping(0, PPQN))).to(equal([0]))
+        expect(list(buffer.overlapping(8 * PPQN, 9 * PPQN))).to(equal([]))
+
+    def test_overlapping_matches_scan(self):
+        rng = random.Random(3)
+        buffer = NoteBuffer()
+        for _ in range(300):
+            start = rng.randrange(64) * PPQN // 4
+            buffer.append(start, start + rng.randrange(16) * PPQN // 4, 60, 100, 1)
+
+        order = list(buffer.order())
+        for start in range(0, 17 * PPQN, PPQN // 2):
+            for end in (start, start + PPQN // 4, start + 3 * PPQN):
+                expected = [i for i in order if buffer.end[i] > start and buffer.start[i] < end]
+                expect(list(buffer.overlapping(start, end))).to(equal(expected))
+
+    def test_overlapping_under_long_note(self):
+        buffer = NoteBuffer()
+        buffer.append(0, 1000 * PPQN, 36, 100, 1)
+        for beat in range(1000):
+            buffer.append(beat * PPQN, (beat + 1) * PPQN, 42, 100, 1)
+
+        list(buffer.overlapping(0, 0))
+        index = buffer._index
+        index.starts, index.ends = CountingArray(index.starts), CountingArray(index.ends)
+
+        expect(list(buffer.overlapping(500 * PPQN, 501 * PPQN))).to(equal([0, 501]))
+        # bisects only, the notes under the long one are not walked
+        expect(index.starts.reads + index.ends.reads).to(be_below(50))
+
+    def test_overlapping_after_append(self):
+        expect(list(self.buffer.overlapping(3 * PPQN, 4 * PPQN))).to(equal([]))
+
+        self.buffer.append(3 * PPQN, 4 * PPQN, 67, 100, 1)
+        expect(list(self.buffer.overlapping(3 * PPQN, 4 * PPQN))).to(equal([2]))
+
+    def test_bounds(self):
+        buffer = NoteBuffer()
+        expect(buffer.min_start).to(equal(0))
+        expect(buffer.max_end).to(equal(0))
+
+        buffer.append(2 * PPQN, 3 * PPQN, 60, 100, 1)
+        expect(buffer.min_start).to(equal(2 * PPQN))
+        expect(buffer.max_end).to(equal(3 * PPQN))
+
+        buffer.extend(self.buffer, offset=-PPQN)
+        expect(buffer.min_start).to(equal(-PPQN))
+        expect(buffer.max_end).to(equal(3 * PPQN))
+
+        buffer.extend(self.buffer, offset=4 * PPQN)
+        expect(buffer.min_start).to(equal(-PPQN))
+        expect(buffer.max_end).to(equal(6 * PPQN))
+
+    def test_view(self):
+        view = BufferView.of(self.buffer).shifted(PPQN, channel=3)
+        self.buffer.append(5 * PPQN, 6 * PPQN, 67, 100, 1)
+
+        buffer = NoteBuffer()
+        buffer.extend_view(view)
+
+        expect(buffer).to(have_len(2))
+        expect(buffer.row(0)).to(equal((PPQN, 2 * PPQN, 60, 100, 3)))
+        expect((buffer.min_start, buffer.max_end)).to(equal((view.min_start, view.max_end)))
+
+
+class TestTicks(unittest.TestCase):
+    def test_beats_to_ticks(self):
+        expect(beats_to_ticks(2)).to(equal(2 * PPQN))
+        expect(beats_to_ticks(2, 12.5)).to(equal(2 * PPQN + PPQN // 8))
+        expect(beats_to_ticks(2, -50)).to(equal(PPQN + PPQN // 2))
+
+    def test_ticks_to_beats(self):
+        expect(ticks_to_beats(2 * PPQN + PPQN // 8)).to(equal((2, 12.5)))
+        expect(ticks_to_beats(-PPQN // 4)).to(equal((-1, 75.0)))
+
+    def test_convert_ticks(self):
+        expect(convert_ticks(88, 96)).to(equal(88 * PPQN // 96))
+        expect(convert_ticks(PPQN + PPQN // 2, PPQN, 16)).to(equal(24))
+        expect(convert_ticks(1, 32, 16)).to(equal(1))
+        expect(convert_ticks(1, 48, 16)).to(equal(0))
@@ -1,16 +1,36 @@
+import asyncio
+import os
+import time
 import unittest
+from unittest.mock import MagicMock
 
-from expects import equal, expect, have_key, have_len
+from expects import be, be_above_or_equal, be_below, contain, equal, expect, have_key, have_len
 
 from mozart.midifile import parse_midfile
-from mozart.player import Clip, PlayedNote, Track
+from mozart.notebuffer import PPQN
+from mozart.player import Clip, PlayedNote, PlayedNoteView, Player, Track
+from mozart.ports import PortRegistry
 from mozart.primitives import MidiNote, Note
 
 
+class TestPlayedNote(unittest.TestCase):
+    def test_ticks(self):
+        note = PlayedNote(MidiNote(Note.D, 4), starts_at=1, ends_at=2, starts_at_offset=25, ends_at_offset=-50)
+
+        expect(note.start_tick).to(equal(PPQN + PPQN // 4))
+        expect(note.end_tick).to(equal(PPQN + PPQN // 2))
+
+    def test_from_ticks(self):
+        note = PlayedNote.from_ticks(MidiNote(Note.D, 4), PPQN + PPQN // 4, 2 * PPQN)
+
+        expect((note.starts_at, note.starts_at_offset)).to(equal((1, 25.0)))
+        expect((note.ends_at, note.ends_at_offset)).to(equal((2, 0.0)))
+
+
 class TestClip(unittest.TestCase):
     def setUp(self) -> None:
         self.note = MidiNote(Note.D, 4)
-        self.midi_clip = parse_midfile(r"tests\test_files\test_midi.mid")
+        self.midi_clip = parse_midfile(os.path.join("tests", "test_files", "test_midi.mid"))
 
     def test_clip_ends_at(self):
         played_note = PlayedNote(self.note, starts_at=0, ends_at=2)
@@ -58,6 +78,30 @@ class TestClip(unittest.TestCase):
 
         expect(clip.ends_at).to(equal(7))
 
+    def test_played_notes_view(self):
+        played_note = PlayedNote(self.note, starts_at=1, ends_at=2, starts_at_offset=50, midi_channel=2)
+        clip = Clip(played_notes=[played_note])
+
+        expect(clip.played_notes).to(have_len(1))
+        expect(clip.played_notes[0]).to(equal(played_note))
+
+        clip.played_notes[0].midi_channel = 5
+        expect(clip.played_notes[0].midi_channel).to(equal(2))
+
+        clip.set_midi_channel(5)
+        expect(clip.played_notes[0].midi_channel).to(equal(5))
+
+    def test_concat_shares_notes(self):
+        clip = Clip(played_notes=[PlayedNote(self.note, starts_at=0, ends_at=2)])
+        loop = Clip(played_notes=[PlayedNote(self.note, starts_at=0, ends_at=4)])
+
+        clip.concat(loop)
+        clip.concat(clip)
+        loop.append(PlayedNote(self.note, starts_at=1, ends_at=3))
+
+        expect(clip.ends_at).to(equal(12))
+        expect([(n.starts_at, n.ends_at) for n in clip.played_notes]).to(equal([(0, 2), (2, 6), (6, 8), (8, 12)]))
+
     def test_rounding_by_4(self):
         clip = self.midi_clip.clip
         expect(clip.ends_at).to(equal(11))
@@ -162,10 +206,34 @@ class TestClip(unittest.TestCase):
         expect(e.effective_start).to(equal(1.75))
         expect(e.effective_end).to(equal(2.0))
 
+    def test_split_into_bars(self):
+        clip = self.midi_clip.clip
+        bars = clip.split_into_bars(4)
+
+        expect(bars).to(have_len(3))
+        expect(bars[-1].notes.max_end).to(equal(round(3.75 * PPQN)))
+        for i, bar in enumerate(bars):
+            expect(bar).to(equal(clip.cut(i * 4, (i + 1) * 4)))
+
+    def test_split_at(self):
+        clip = self.midi_clip.clip
+        clips = clip.split_at([1, 3, 8])
+
+        # the last note ends at 11.75 beats
+        expect(clips).to(have_len(4))
+        for clip_, (start, end) in zip(clips, [(0, 1), (1, 3), (3, 8), (8, 12)]):
+            expect(clip_).to(equal(clip.cut(start, end)))
+
+        expect(sum(len(clip_.notes) for clip_ in clips)).to(be_above_or_equal(len(clip.notes)))
+        expect(clips[-1].notes.max_end).to(equal(round(3.75 * PPQN)))
+
+        with self.assertRaises(ValueError):
+            clip.split_at([3, 1])
+
 
 class TestTrack(unittest.TestCase):
     def setUp(self):
-        self.midi_clip = parse_midfile(r"tests\test_files\test_midi.mid")
+        self.midi_clip = parse_midfile(os.path.join("tests", "test_files", "test_midi.mid"))
 
         self.clip_1 = self.midi_clip.clip.cut(0, 4)
         self.clip_2 = self.midi_clip.clip.cut(8, 12)
@@ -256,6 +324,36 @@ class TestTrack(unittest.TestCase):
             expect(renderd_note.effective_start).to(equal(og_note.effective_start + 12))
             expect(renderd_note.effective_end).to(equal(og_note.effective_end + 12))
 
+    def test_render_buffer(self):
+        track = Track(midi_channel=4)
+        track.append(self.clip_2)
+        track.append(self.clip_1)
+
+        buffer = track.render_buffer()
+        expect(buffer).to(have_len(len(self.clip_2.notes) + len(self.clip_1.notes)))
+        expect(set(buffer.channel)).to(equal({4}))
+        expect(list(PlayedNoteView(buffer))).to(equal(track.render()))
+
+    def test_render_stream(self):
+        track = Track(midi_channel=2)
+        track.append(self.clip_2)
+        track.put(self.clip_1, 6)
+        track.put(self.clip_2.copy().concat(self.clip_1), 12)
+
+        buffer = track.render_buffer()
+        notes = list(track.render_stream())
+
+        expect(notes).to(equal(sorted(buffer.rows())))
+
+    def test_render_events(self):
+        track = Track(midi_channel=2)
+        track.append(self.clip_2)
+        track.append(self.clip_1)
+
+        events = list(track.render_events())
+        expect(events).to(have_len(2 * len(track.render_buffer())))
+        expect([e[0] for e in events]).to(equal(sorted(e[0] for e in events)))
+
     def test_put_on_existing_with_overlap(self):
         track = Track()
         track.append(self.clip_2)
@@ -266,6 +364,27 @@ class TestTrack(unittest.TestCase):
 
         track.put(self.clip_1, 4)
 
+    def test_append_after_empty_clip(self):
+        track = Track()
+        track.append(Clip(_ends_at=4))
+        track.append(self.clip_1)
+
+        expect(track.clips).to(equal({0: self.clip_1}))
+        expect(track.ends_at).to(equal(4))
+
+    def test_put_ending_inside_existing(self):
+        track = Track()
+        track.put(self.clip_2, 6)
+
+        with self.assertRaises(ValueError):
+            track.put(self.clip_1, 4)
+
+        with self.assertRaises(ValueError):
+            track.put(self.clip_1, 6)
+
+        track.put(self.clip_1, 2)
+        expect(track.ends_at).to(equal(10))
+
     def test_append_after_put(self):
         track = Track()
         track.put(self.clip_2, 2)
@@ -301,3 +420,226 @@ class TestTrack(unittest.TestCase):
             expect(renderd_note.ends_at_offset).to(equal(og_note.ends_at_offset))
             expect(renderd_note.effective_start).to(equal(og_note.effective_start + 5))
             expect(renderd_note.effective_end).to(equal(og_note.effective_end + 5))
+
+
+class TestPlayer(unittest.TestCase):
+    def setUp(self):
+        self.registry = PortRegistry()
+
+        self.clip = parse_midfile(os.path.join("tests", "test_files", "test_midi.mid")).clip
+
+    def test_render(self):
+        player = Player(backend="memory", registry=self.registry)
+        player.render(self.clip.notes)
+
+        expect(player.timeline).to(have_len(2 * len(self.clip.notes)))
+        expect(player.timeline.ends_at).to(equal(round(11.75 * player.ticks_per_beat)))
+
+    def test_render_ticks_per_beat(self):
+        player = Player(backend="memory", registry=self.registry, ticks_per_beat=96)
+        player.render(self.clip.notes)
+
+        expect(player.timeline.ends_at).to(equal(round(11.75 * 96)))
+
+        # B of bar 3 ends at 10 + 88/96 beats, which 16 ticks per beat can not represent
+        expect(player.timeline.tick).to(contain(10 * 96 + 88))
+
+    def test_render_short_note(self):
+        # a 1/32 beat note, shorter than a tick of the player
+        note = PlayedNote(MidiNote(Note.C, 3), starts_at=1, ends_at=1, ends_at_offset=3, midi_channel=1)
+
+        player = Player(bpm=6000, backend="memory", registry=self.registry)
+        player.render([note])
+        expect(list(player.timeline.events())).to(equal([(16, 0x91, 36, 100), (17, 0x81, 36, 0)]))
+
+        player.play()
+        expect([m.type for m in player.outport.messages]).to(equal(["note_on", "note_off"]))
+
+    def test_render_events_short_note(self):
+        track = Track(midi_channel=1)
+        track.put(Clip(played_notes=[PlayedNote(MidiNote(Note.C, 3), starts_at=1, ends_at=1, ends_at_offset=3)]), 0)
+
+        player = Player(backend="memory", registry=self.registry)
+        player.render_events(track.render_events())
+        expect(list(player.timeline.events())).to(equal([(16, 0x91, 36, 100), (17, 0x81, 36, 0)]))
+
+    def test_render_invalid_channel(self):
+        player = Player(backend="memory", registry=self.registry)
+
+        with self.assertRaises(ValueError):
+            player.render([PlayedNote(MidiNote(Note.C, 3), starts_at=0, ends_at=1, midi_channel=16)])
+
+    def test_render_is_per_player(self):
+        player = Player(backend="memory", registry=self.registry)
+        player.render(self.clip.notes)
+
+        expect(Player(backend="memory", registry=self.registry).timeline).to(have_len(0))
+
+    def test_clear(self):
+        player = Player(backend="memory", registry=self.registry)
+        player.render(self.clip.played_notes)
+        player.clear()
+
+        expect(player.timeline).to(have_len(0))
+
+    def test_play(self):
+        player = Player(bpm=6000, backend="memory", registry=self.registry)
+        player.render([PlayedNote(MidiNote(Note.D, 4), starts_at=0, ends_at=1, midi_channel=1)])
+        player.render([PlayedNote(MidiNote(Note.E, 4), starts_at=4, ends_at=5, midi_channel=1)])
+        player.play()
+
+        sent = player.outport.messages
+        expect([(m.type, m.note) for m in sent]).to(
+            equal([("note_on", 50), ("note_off", 50), ("note_on", 52), ("note_off", 52)])
+        )
+
+    def test_play_stats(self):
+        player = Player(bpm=6000, backend="memory", registry=self.registry)
+        player.render([PlayedNote(MidiNote(Note.D, 4), starts_at=0, ends_at=1, midi_channel=1)])
+        player.play()
+
+        stats = player.stats()
+        expect(stats.count).to(equal(2))
+        expect(stats.max_lateness).to(be_above_or_equal(stats.p50_lateness))
+
+    def test_play_note_on_without_velocity(self):
+        player = Player(bpm=6000, backend="memory", registry=self.registry)
+        player.render_events([(0, 0x91, 50, 100), (PPQN, 0x91, 50, 0)])
+        player.play()
+
+        expect([(m.type, m.velocity) for m in player.outport.messages]).to(equal([("note_on", 100), ("note_on", 0)]))
+
+    def test_play_loop(self):
+        player = Player(bpm=6000, backend="memory", registry=self.registry)
+        player.render([PlayedNote(MidiNote(Note.D, 4), starts_at=0, ends_at=3, midi_channel=1)])
+        player.render([PlayedNote(MidiNote(Note.E, 4), starts_at=1, ends_at=2, midi_channel=1)])
+        player.render([PlayedNote(MidiNote(Note.F, 4), starts_at=2, ends_at=3, midi_channel=1)])
+
+        player.play(start_beat=1, end_beat=2, loop=2)
+
+        # D is held across the loop, but never started; E is played twice
+        sent = player.outport.messages
+        expect([(m.type, m.note) for m in sent]).to(
+            equal([("note_on", 52), ("note_off", 52), ("note_on", 52), ("note_off", 52)])
+        )
+
+    def test_play_loop_turns_off_held_notes(self):
+        player = Player(bpm=6000, backend="memory", registry=self.registry)
+        player.render([PlayedNote(MidiNote(Note.D, 4), starts_at=0, ends_at=3, midi_channel=1)])
+
+        player.play(end_beat=1, loop=2)
+
+        sent = player.outport.messages
+        expect([(m.type, m.note) for m in sent]).to(
+            equal([("note_on", 50), ("note_off", 50), ("note_on", 50), ("note_off", 50)])
+        )
+
+    def test_play_invalid_range(self):
+        player = Player(bpm=6000, backend="memory", registry=self.registry)
+        player.render(self.clip.notes)
+
+        with self.assertRaises(ValueError):
+            player.play(start_beat=2, end_beat=1)
+
+    def test_play_with_tempo_change(self):
+        player = Player(bpm=600, backend="memory", registry=self.registry)
+        player.set_tempo(1, 6000)
+        player.render([PlayedNote(MidiNote(Note.D, 4), starts_at=0, ends_at=8, midi_channel=1)])
+
+        started_at = time.perf_counter()
+        player.play()
+
+        # 1 beat at 600 bpm, 7 at 6000
+        expect(time.perf_counter() - started_at).to(be_below(0.5))
+        expect(time.perf_counter() - started_at).to(be_above_or_equal(0.1 + 0.07))
+
+    def test_play_ahead(self):
+        player = Player(bpm=6000, backend="memory", registry=self.registry)
+        player.render([PlayedNote(MidiNote(Note.D, 4), starts_at=0, ends_at=1, midi_channel=1)])
+        player.render([PlayedNote(MidiNote(Note.E, 4), starts_at=4, ends_at=5, midi_channel=1)])
+        player.play_ahead(lookahead_beats=1)
+
+        sent = player.outport.messages
+        expect([(m.type, m.note) for m in sent]).to(
+            equal([("note_on", 50), ("note_off", 50), ("note_on", 52), ("note_off", 52)])
+        )
+
+    def test_schedule_follows_tempo_map(self):
+        player = Player(bpm=6000, backend="memory", registry=self.registry)
+        player.set_tempo(1, 3000)
+        player.render([PlayedNote(MidiNote(Note.D, 4), starts_at=0, ends_at=1, midi_channel=1)])
+
+        scheduled = []
+        engine = MagicMock()
+        engine.schedule.side_effect = lambda at, message: scheduled.append((round(at, 6), message.type))
+
+        # 1 beat at 6000 bpm and 1 at 3000 bpm
+        player.schedule(engine, start_beat=2)
+        expect(scheduled).to(equal([(0.03, "note_on"), (0.04, "note_off")]))
+
+    def test_play_async_concurrently(self):
+        players = [Player(bpm=6000, port_name=name, backend="memory", registry=self.registry) for name in "ab"]
+        for player in players:
+            player.render([PlayedNote(MidiNote(Note.D, 4), starts_at=0, ends_at=1, midi_channel=1)])
+
+        async def play():
+            await asyncio.gather(*(player.play_async() for player in players))
+
+        asyncio.run(play())
+
+        for player in players:
+            sent = player.outport.messages
+            expect([(m.type, m.note) for m in sent]).to(equal([("note_on", 50), ("note_off", 50)]))
+
+    def test_play_async_cancel(self):
+        player = Player(backend="memory", registry=self.registry)
+        player.render([PlayedNote(MidiNote(Note.D, 4), starts_at=0, ends_at=16, midi_channel=1)])
+
+        async def play():
+            task = asyncio.create_task(player.play_async())
+            await asyncio.sleep(0.05)
+            task.cancel()
+
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(play())
+
+        sent = player.outport.messages
+        expect([(m.type, m.note) for m in sent]).to(equal([("note_on", 50), ("note_off", 50)]))
+
+    def test_play_async_pause(self):
+        player = Player(bpm=600, backend="memory", registry=self.registry)
+        player.render([PlayedNote(MidiNote(Note.D, 4), starts_at=0, ends_at=1, midi_channel=1)])
+        player.render([PlayedNote(MidiNote(Note.E, 4), starts_at=1, ends_at=2, midi_channel=1)])
+
+        async def play():
+            task = asyncio.create_task(player.play_async())
+            await asyncio.sleep(0.02)
+            player.pause()
+            await asyncio.sleep(0.2)
+
+            # note D is turned off, note E is not played while paused
+            sent = player.outport.messages
+            expect([(m.type, m.note) for m in sent]).to(equal([("note_on", 50), ("note_off", 50)]))
+
+            player.resume()
+            await task
+
+        asyncio.run(play())
+
+        sent = player.outport.messages
+        expect([(m.type, m.note) for m in sent[2:]]).to(equal([("note_off", 50), ("note_on", 52), ("note_off", 52)]))
+
+    def test_port_is_opened_lazily_and_shared(self):
+        player = Player(backend="memory", registry=self.registry)
+        expect(self.registry.is_open(player.port_name, "memory")).to(equal(False))
+
+        other = Player(backend="memory", registry=self.registry)
+        expect(player.outport).to(be(other.outport))
+
+        player.close()
+        expect(self.registry.is_open(player.port_name, "memory")).to(equal(True))
+
+        other.close()
+        expect(self.registry.is_open(player.port_name, "memory")).to(equal(False))
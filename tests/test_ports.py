@@ -0,0 +1,47 @@
+import unittest
+from unittest.mock import MagicMock
+
+import mido
+from expects import be, be_true, equal, expect
+
+from mozart.ports import MemoryPort, NullPort, PortRegistry
+
+
+class TestPortRegistry(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = PortRegistry()
+
+    def test_acquire_shares_port(self):
+        port = self.registry.acquire("a", "memory")
+
+        expect(self.registry.acquire("a", "memory")).to(be(port))
+        expect(self.registry.acquire("b", "memory")).to_not(be(port))
+
+    def test_release_closes_last(self):
+        port = self.registry.acquire("a", "null")
+        self.registry.acquire("a", "null")
+
+        self.registry.release("a", "null")
+        expect(port.closed).to(equal(False))
+
+        self.registry.release("a", "null")
+        expect(port.closed).to(be_true)
+        expect(self.registry.is_open("a", "null")).to(equal(False))
+
+    def test_register_backend(self):
+        opener = MagicMock(return_value=NullPort())
+        self.registry.register_backend("custom", opener)
+
+        self.registry.acquire("a", "custom")
+        opener.assert_called_once_with("a")
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            self.registry.acquire("a", "unknown")
+
+    def test_memory_port(self):
+        port = MemoryPort()
+        message = mido.Message("note_on", note=60)
+        port.send(message)
+
+        expect(port.messages).to(equal([message]))
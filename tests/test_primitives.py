@@ -1,7 +1,7 @@
 import unittest
 from unittest.mock import patch
 
-from expects import equal, expect, have_len
+from expects import be, equal, expect, have_len
 
 from mozart.primitives import MAJOR_SCALE_CHORD_TYPES, MAJOR_SCALE_INTERVALS, MidiNote, Mode, Note
 
@@ -23,20 +23,20 @@ class TestMidiNote(unittest.TestCase):
         expect(note.octave).to(equal(self.note.octave + 1))
 
     def test_sharpen(self):
-        self.note.sharpen()
-        expect(self.note.note).to(equal(Note.D_sharp))
+        note = self.note.sharpen()
+        expect(note.note).to(equal(Note.D_sharp))
+        expect(self.note.note).to(equal(Note.D))
 
-        note = MidiNote(Note.B, 4)
-        note.sharpen()
+        note = MidiNote(Note.B, 4).sharpen()
         expect(note.note).to(equal(Note.C))
         expect(note.octave).to(equal(5))
 
     def test_flatten(self):
-        self.note.flatten()
-        expect(self.note.note).to(equal(Note.C_sharp))
+        note = self.note.flatten()
+        expect(note.note).to(equal(Note.C_sharp))
+        expect(self.note.note).to(equal(Note.D))
 
-        note = MidiNote(Note.C, 4)
-        note.flatten()
+        note = MidiNote(Note.C, 4).flatten()
         expect(note.note).to(equal(Note.B))
         expect(note.octave).to(equal(3))
 
@@ -52,7 +52,30 @@ class TestMidiNote(unittest.TestCase):
 
     def test_duplicate(self):
         note = self.note.copy()
-        expect(id(note)).to_not(equal(id(self.note)))
+        expect(note).to(be(self.note))
+
+    def test_interned(self):
+        expect(MidiNote(Note.D, 4)).to(be(self.note))
+        expect(MidiNote.from_midi(self.note.midi)).to(be(self.note))
+        expect(MidiNote(Note.D, 4, velocity=90)).to_not(be(self.note))
+
+    def test_immutable(self):
+        with self.assertRaises(AttributeError):
+            self.note.octave = 5
+
+        expect(self.note.octave).to(equal(4))
+
+    def test_with_octave(self):
+        note = self.note.with_octave(5)
+        expect(note.note).to(equal(Note.D))
+        expect(note.octave).to(equal(5))
+        expect(note.velocity).to(equal(self.note.velocity))
+
+    def test_with_velocity(self):
+        note = self.note.with_velocity(60)
+        expect(note.midi).to(equal(self.note.midi))
+        expect(note.velocity).to(equal(60))
+        expect(note.with_velocity(100)).to(be(self.note))
 
 
 class TestMode(unittest.TestCase):
@@ -0,0 +1,62 @@
+import os
+import unittest
+
+from expects import be_above_or_equal, be_empty, contain, equal, expect, have_key
+
+from mozart import profiling
+from mozart.midifile import parse_midfile
+from mozart.profiling import CollectingSink, profiled, span
+
+
+@profiled("double")
+def double(x):
+    return x * 2
+
+
+class TestProfiling(unittest.TestCase):
+    def tearDown(self) -> None:
+        profiling.disable()
+
+    def test_disabled(self):
+        with span("block"):
+            pass
+
+        expect(double(2)).to(equal(4))
+        expect(profiling.is_enabled()).to(equal(False))
+
+    def test_span(self):
+        sink = profiling.enable()
+
+        for _ in range(3):
+            with span("block"):
+                objects = [object() for _ in range(100)]
+
+        expect(sink.spans["block"].calls).to(equal(3))
+        expect(sink.spans["block"].wall).to(be_above_or_equal(0))
+        expect(sink.spans["block"].allocated).to(be_above_or_equal(100))
+        del objects
+
+    def test_profiled(self):
+        sink = profiling.enable(CollectingSink())
+
+        expect(double(2)).to(equal(4))
+        expect(sink.spans["double"].calls).to(equal(1))
+
+    def test_span_records_on_error(self):
+        sink = profiling.enable()
+
+        with self.assertRaises(ValueError):
+            with span("block"):
+                raise ValueError()
+
+        expect(sink.spans["block"].calls).to(equal(1))
+
+    def test_pipeline_spans(self):
+        sink = profiling.enable()
+        parse_midfile(os.path.join("tests", "test_files", "test_midi.mid"))
+
+        expect(sink.spans).to(have_key("mozart.midifile.parse_midfile"))
+        expect(sink.report()).to(contain("mozart.midifile.parse_midfile"))
+
+        sink.clear()
+        expect(sink.spans).to(be_empty)
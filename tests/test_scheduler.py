@@ -0,0 +1,20 @@
+import time
+import unittest
+
+from expects import be_above_or_equal, be_below, expect
+
+from mozart.scheduler import wait_until
+
+
+class TestWaitUntil(unittest.TestCase):
+    def test_wait_until(self):
+        deadline = time.perf_counter() + 0.01
+        wait_until(deadline, spin=0.002)
+
+        expect(time.perf_counter()).to(be_above_or_equal(deadline))
+
+    def test_passed_deadline(self):
+        started_at = time.perf_counter()
+        wait_until(started_at - 1)
+
+        expect(time.perf_counter() - started_at).to(be_below(0.01))
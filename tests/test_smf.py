@@ -0,0 +1,142 @@
+import os
+import tempfile
+import unittest
+
+from expects import equal, expect
+from mido import Message, MetaMessage, MidiFile, bpm2tempo
+
+from mozart.midifile import parse_midfile
+from mozart.notebuffer import PPQN
+from mozart.player import Track
+from mozart.primitives import TimeSignature
+from mozart.smf import META_TEMPO, META_TIME_SIGNATURE, MidiFileWriter, encode_varlen, read_smf
+
+
+class TestEncodeVarlen(unittest.TestCase):
+    def test_encode_varlen(self):
+        expect(encode_varlen(0)).to(equal(b"\x00"))
+        expect(encode_varlen(0x7F)).to(equal(b"\x7f"))
+        expect(encode_varlen(0x80)).to(equal(b"\x81\x00"))
+        expect(encode_varlen(0x0FFFFFFF)).to(equal(b"\xff\xff\xff\x7f"))
+
+
+class TestMidiFileWriter(unittest.TestCase):
+    def setUp(self) -> None:
+        self.track = Track(midi_channel=1)
+        self.track.append(parse_midfile(os.path.join("tests", "test_files", "test_midi.mid")).clip)
+
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.filepath = os.path.join(tmp_dir.name, "stream.mid")
+
+    def test_write_events(self):
+        # a small buffer to flush many times
+        with MidiFileWriter(self.filepath, bpm=90, time_signature=TimeSignature(6, 8), buffer_size=16) as writer:
+            writer.write_events(self.track.render_events())
+
+        mid = MidiFile(self.filepath)
+        expect((mid.type, mid.ticks_per_beat)).to(equal((0, PPQN)))
+
+        tick = 0
+        events = []
+        meta = {}
+        for msg in mid.tracks[0]:
+            tick += msg.time
+            if msg.is_meta:
+                meta[msg.type] = msg
+                continue
+
+            velocity = 0 if msg.type == "note_off" else msg.velocity
+            events.append((tick, msg.bytes()[0], msg.note, velocity))
+
+        expect(events).to(equal(list(self.track.render_events())))
+        expect(meta["set_tempo"].tempo).to(equal(bpm2tempo(90)))
+        expect((meta["time_signature"].numerator, meta["time_signature"].denominator)).to(equal((6, 8)))
+
+    def test_write_ticks_per_beat(self):
+        with MidiFileWriter(self.filepath, ticks_per_beat=480) as writer:
+            writer.write_events(self.track.render_events())
+
+        mid = MidiFile(self.filepath)
+        expect(mid.ticks_per_beat).to(equal(480))
+
+        ticks = sum(msg.time for msg in mid.tracks[0])
+        expect(ticks).to(equal(self.track.render_buffer().max_end * 480 // PPQN))
+
+    def test_write_out_of_order(self):
+        with MidiFileWriter(self.filepath) as writer:
+            writer.write(10, 0x90, 60, 100)
+
+            with self.assertRaises(ValueError):
+                writer.write(5, 0x80, 60, 0)
+
+
+class TestReadSmf(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.filepath = os.path.join(tmp_dir.name, "read.mid")
+
+    def test_read_written_events(self):
+        track = Track(midi_channel=1)
+        track.append(parse_midfile(os.path.join("tests", "test_files", "test_midi.mid")).clip)
+        events = list(track.render_events())
+
+        # the writer uses running status
+        with MidiFileWriter(self.filepath, bpm=90, time_signature=TimeSignature(6, 8)) as writer:
+            writer.write_events(events)
+
+        smf = read_smf(self.filepath)
+        expect(smf.ticks_per_beat).to(equal(PPQN))
+        expect(list(smf.events())).to(equal(events))
+        expect(smf.last_meta(META_TEMPO)).to(equal(bpm2tempo(90).to_bytes(3, "big")))
+        expect(smf.last_meta(META_TIME_SIGNATURE)[:2]).to(equal(bytes([6, 3])))
+
+    def test_merge_tracks(self):
+        mid = MidiFile(type=1, ticks_per_beat=96)
+        mid.add_track().extend(
+            [
+                MetaMessage("set_tempo", tempo=bpm2tempo(100), time=0),
+                Message("note_on", note=60, velocity=90, time=200),
+                Message("note_off", note=60, time=10),
+            ]
+        )
+        mid.add_track().extend(
+            [
+                Message("sysex", data=[1, 2, 3], time=0),
+                Message("program_change", program=5, time=0),
+                Message("note_on", note=62, velocity=80, time=200),
+                MetaMessage("set_tempo", tempo=bpm2tempo(120), time=0),
+                Message("note_off", note=62, time=5),
+            ]
+        )
+        mid.save(self.filepath)
+
+        smf = read_smf(self.filepath)
+        expect(list(smf.events())).to(
+            equal([(200, 0x90, 60, 90), (200, 0x90, 62, 80), (205, 0x80, 62, 64), (210, 0x80, 60, 64)])
+        )
+        expect(smf.last_meta(META_TEMPO)).to(equal(bpm2tempo(120).to_bytes(3, "big")))
+
+    def test_truncated_track(self):
+        with MidiFileWriter(self.filepath, ticks_per_beat=96) as writer:
+            writer.write(0, 0x90, 60, 100)
+            writer.write(96, 0x80, 60, 0)
+
+        with open(self.filepath, "rb") as file:
+            data = file.read()
+
+        # cuts into events and at their boundaries, the chunk length is left as it was
+        for size in (len(data) - 1, len(data) - 3, len(data) - 4, len(data) - 5, len(data) - 8):
+            with open(self.filepath, "wb") as file:
+                file.write(data[:size])
+
+            with self.assertRaises(ValueError):
+                read_smf(self.filepath)
+
+    def test_not_a_midi_file(self):
+        with open(self.filepath, "wb") as file:
+            file.write(b"RIFF" + bytes(10))
+
+        with self.assertRaises(ValueError):
+            read_smf(self.filepath)
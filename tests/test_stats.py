@@ -0,0 +1,47 @@
+import unittest
+
+from expects import be_above, equal, expect
+
+from mozart.stats import TimingStats, percentile
+
+
+class TestTimingStats(unittest.TestCase):
+    def test_summary(self):
+        stats = TimingStats(late_after=0.005)
+        for i in range(100):
+            stats.record(0, i / 1000, 0.0001)
+
+        summary = stats.summary()
+        expect(summary.count).to(equal(100))
+        expect(summary.p50_lateness).to(equal(0.049))
+        expect(summary.p99_lateness).to(equal(0.098))
+        expect(summary.max_lateness).to(equal(0.099))
+        expect(summary.max_send_duration).to(equal(0.0001))
+        expect(summary.late).to(equal(94))
+        expect(summary.sends_per_second).to(be_above(999))
+
+    def test_ring_buffer(self):
+        stats = TimingStats(size=4)
+        for i in range(10):
+            stats.record(i, i + i, 0)
+
+        summary = stats.summary()
+        expect(summary.count).to(equal(10))
+        expect(summary.p50_lateness).to(equal(7))
+        expect(summary.max_lateness).to(equal(9))
+
+    def test_drop_and_reset(self):
+        stats = TimingStats()
+        stats.record(0, 1, 0)
+        stats.drop(3)
+
+        expect(stats.summary().dropped).to(equal(3))
+
+        stats.reset()
+        summary = stats.summary()
+        expect((summary.count, summary.late, summary.dropped, summary.max_lateness)).to(equal((0, 0, 0, 0)))
+
+    def test_percentile(self):
+        expect(percentile([], 50)).to(equal(0))
+        expect(percentile([1.0], 99)).to(equal(1))
+        expect(percentile([1.0, 2.0, 3.0, 4.0], 50)).to(equal(2))
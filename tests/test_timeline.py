@@ -0,0 +1,93 @@
+import unittest
+
+from expects import equal, expect, have_len
+
+from mozart.timeline import NOTE_OFF, NOTE_ON, TempoMap, Timeline, note_events
+
+
+class TestNoteEvents(unittest.TestCase):
+    def test_note_events(self):
+        notes = [
+            (0, 20, 36, 100, 0),
+            (0, 10, 60, 90, 1),
+            (10, 20, 60, 80, 1),
+        ]
+
+        expect(list(note_events(notes))).to(
+            equal(
+                [
+                    (0, NOTE_ON, 36, 100),
+                    (0, NOTE_ON | 1, 60, 90),
+                    (10, NOTE_OFF | 1, 60, 0),
+                    (10, NOTE_ON | 1, 60, 80),
+                    (20, NOTE_OFF, 36, 0),
+                    (20, NOTE_OFF | 1, 60, 0),
+                ]
+            )
+        )
+
+
+class TestTimeline(unittest.TestCase):
+    def setUp(self) -> None:
+        self.timeline = Timeline()
+        self.timeline.add(4, NOTE_ON, 62, 100)
+        self.timeline.add(8, NOTE_OFF, 62, 0)
+        self.timeline.add(0, NOTE_ON, 60, 100)
+        self.timeline.add(4, NOTE_OFF, 60, 0)
+
+    def test_compile(self):
+        self.timeline.compile()
+
+        expect(list(self.timeline.tick)).to(equal([0, 4, 4, 8]))
+        expect(list(self.timeline.delta)).to(equal([0, 4, 0, 4]))
+        expect(list(self.timeline.status)).to(equal([NOTE_ON, NOTE_OFF, NOTE_ON, NOTE_OFF]))
+        expect(list(self.timeline.note)).to(equal([60, 60, 62, 62]))
+        expect(self.timeline.ends_at).to(equal(8))
+
+    def test_groups(self):
+        expect(list(self.timeline.groups())).to(equal([(0, 0, 1), (4, 1, 3), (8, 3, 4)]))
+        expect(list(self.timeline.events(1, 3))).to(equal([(4, NOTE_OFF, 60, 0), (4, NOTE_ON, 62, 100)]))
+
+    def test_seek(self):
+        expect(self.timeline.seek(0)).to(equal(0))
+        expect(self.timeline.seek(3)).to(equal(1))
+        expect(self.timeline.seek(4)).to(equal(1))
+        expect(self.timeline.seek(9)).to(equal(4))
+
+        expect(list(self.timeline.groups(1, 3))).to(equal([(4, 1, 3)]))
+
+    def test_clear(self):
+        self.timeline.clear()
+
+        expect(self.timeline).to(have_len(0))
+        expect(list(self.timeline.groups())).to(equal([]))
+
+
+class TestTempoMap(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tempo_map = TempoMap(120, ticks_per_beat=4)
+
+    def test_constant_tempo(self):
+        expect(self.tempo_map.seconds(0)).to(equal(0))
+        expect(self.tempo_map.seconds(8)).to(equal(1.0))
+
+    def test_tempo_changes(self):
+        self.tempo_map.set_tempo(16, 60)
+        self.tempo_map.set_tempo(8, 240)
+
+        expect(self.tempo_map.changes()).to(equal([(0, 120), (8, 240), (16, 60)]))
+        expect(self.tempo_map.bpm_at(10)).to(equal(240))
+
+        # 2 beats at 120, 2 beats at 240, 1 beat at 60
+        expect(self.tempo_map.seconds(8)).to(equal(1.0))
+        expect(self.tempo_map.seconds(16)).to(equal(1.5))
+        expect(self.tempo_map.seconds(20)).to(equal(2.5))
+
+    def test_replace_tempo(self):
+        self.tempo_map.set_tempo(0, 60)
+        expect(self.tempo_map.changes()).to(equal([(0, 60)]))
+        expect(self.tempo_map.seconds(4)).to(equal(1.0))
+
+    def test_invalid_tempo(self):
+        with self.assertRaises(ValueError):
+            self.tempo_map.set_tempo(4, 0)